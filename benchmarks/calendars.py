@@ -0,0 +1,39 @@
+import datetime
+import random
+
+from typing import Callable, Dict, List
+
+from src.github import Contribution
+
+
+def calendar(
+    days: int, count: Callable[[random.Random], int], seed: int = 0
+) -> List[Contribution]:
+    """
+    A synthetic contribution calendar of `days` days ending on a fixed Saturday, most recent day first (like `GitHub.get_user_contributions`).
+    """
+    rng = random.Random(seed)
+    end = datetime.datetime(2024, 12, 28)
+    return [
+        Contribution(end - datetime.timedelta(days=i), count(rng)) for i in range(days)
+    ]
+
+
+def sparse(rng: random.Random) -> int:
+    return rng.randint(1, 3) if rng.random() < 0.1 else 0
+
+
+def dense(rng: random.Random) -> int:
+    return rng.randint(5, 20)
+
+
+def spiky(rng: random.Random) -> int:
+    return rng.randint(100, 300) if rng.random() < 0.01 else rng.randint(0, 2)
+
+
+CALENDARS: Dict[str, Callable[[], List[Contribution]]] = {
+    "sparse": lambda: calendar(53 * 7, sparse),
+    "dense": lambda: calendar(53 * 7, dense),
+    "spiky": lambda: calendar(53 * 7, spiky),
+    "multi-year": lambda: calendar(5 * 52 * 7, dense),
+}
@@ -0,0 +1,390 @@
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import typer
+
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing_extensions import Annotated
+
+from benchmarks.calendars import CALENDARS
+from src.cache import MirrorCache, rev_parse
+from src.fonts import load_font
+from src.github import (
+    CommitBackend,
+    Contribution,
+    GitHub,
+    Visibility,
+    commit,
+    fast_import,
+)
+from src.pack import write_commits
+from src.transport import Transport
+from src.util import Color, HAlign, Pixel, VAlign, rmtree_readonly
+from src.window import Window
+
+app = typer.Typer()
+
+TEXT = "github-paint"
+NAME = "Benchmark"
+EMAIL = "benchmark@example.com"
+REPO = "bench"
+# `git commit` spawns a process per commit, so it's only timed on a fixed number of them
+COMMIT_BACKEND_COMMITS = 200
+
+
+@dataclass
+class Result:
+    name: str
+    calendar: str
+    seconds: float  # median over `runs`
+    runs: int
+    cells: int = 0
+    commits: int = 0
+    peak_bytes: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["cells_per_s"] = self.cells / self.seconds if self.cells else None
+        result["commits_per_s"] = self.commits / self.seconds if self.commits else None
+        return result
+
+
+class LocalTransport(Transport):
+    """
+    Answers the few API calls `make_necessary_commits` makes, so the end-to-end benchmark never leaves the machine.
+    """
+
+    def request(
+        self, method: str, path: str, body: Optional[Any] = None
+    ) -> Tuple[int, Any]:
+        if path == "user":
+            return 200, {"login": REPO, "name": NAME, "email": EMAIL}
+        return 200, {}
+
+
+def measure(
+    run: Callable[[], Any], runs: int, setup: Callable[[], Any] = lambda: None
+) -> Tuple[float, int]:
+    """
+    Returns the median wall time of `run` (calling `setup` untimed before each run), and the peak memory Python allocated during one more run.
+
+    Memory allocated by the git processes we spawn isn't included.
+    """
+    times: List[float] = []
+
+    for _ in range(runs):
+        setup()
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+
+    setup()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def render(weeks: int) -> Window:
+    window = Window(width=weeks, height=7, empty_pixel=Pixel(Color(1)))
+    window.draw_text(
+        TEXT,
+        load_font(),
+        repeat=True,
+        h_align=HAlign.CENTER,
+        v_align=VAlign.CENTER,
+    )
+    return window
+
+
+def init_repo(path: str):
+    subprocess.run(["git", "init", "--quiet", "-b", "main", path], check=True)
+    subprocess.run(["git", "config", "user.name", NAME], cwd=path, check=True)
+    subprocess.run(["git", "config", "user.email", EMAIL], cwd=path, check=True)
+
+
+def bench_calendar(
+    name: str, contribs: List[Contribution], git: GitHub, runs: int, scratch: str
+) -> List[Result]:
+    weeks = len(contribs) // 7
+    cells = weeks * 7
+    results: List[Result] = []
+
+    seconds, peak = measure(lambda: render(weeks), runs)
+    results.append(Result("render", name, seconds, runs, cells=cells, peak_bytes=peak))
+
+    window = render(weeks)
+    text = window.rasterize(TEXT, load_font())
+    seconds, peak = measure(
+        lambda: window.layout(text, HAlign.CENTER, VAlign.CENTER), runs
+    )
+    results.append(Result("layout", name, seconds, runs, cells=cells, peak_bytes=peak))
+
+    levels = window.buf[::-1]
+    no_dummies: defaultdict[int, int] = defaultdict(int)
+
+    for optimize in (False, True):
+        seconds, peak = measure(
+            lambda: git.calc_necessary_contrib_deltas(
+                levels, REPO, contribs, optimize=optimize, dummy_contribs=no_dummies
+            ),
+            runs,
+        )
+        results.append(
+            Result(
+                "deltas (optimized)" if optimize else "deltas",
+                name,
+                seconds,
+                runs,
+                cells=cells,
+                peak_bytes=peak,
+            )
+        )
+
+    deltas = git.calc_necessary_contrib_deltas(
+        levels, REPO, contribs, dummy_contribs=no_dummies
+    )
+    commits = [
+        (delta.date, n == delta.count - 1)
+        for delta in deltas[::-1]
+        for n in range(max(delta.count, 0))
+    ]
+    repo_path = os.path.join(scratch, "commits")
+
+    def fresh_repo():
+        if os.path.exists(repo_path):
+            rmtree_readonly(repo_path)
+        init_repo(repo_path)
+
+    backends: Dict[str, Callable[[], Any]] = {
+        "fast-import": lambda: fast_import(commits, NAME, EMAIL, cwd=repo_path),
+        "pack": lambda: write_commits(
+            [(int(date.timestamp()), "") for date, _ in commits],
+            NAME,
+            EMAIL,
+            os.path.join(repo_path, ".git"),
+        ),
+    }
+
+    for backend, run in backends.items():
+        seconds, peak = measure(run, runs, setup=fresh_repo)
+        results.append(
+            Result(
+                f"commit ({backend})",
+                name,
+                seconds,
+                runs,
+                commits=len(commits),
+                peak_bytes=peak,
+            )
+        )
+
+    few = commits[:COMMIT_BACKEND_COMMITS]
+    seconds, peak = measure(
+        lambda: [commit(date, last, cwd=repo_path) for date, last in few],
+        1,
+        setup=fresh_repo,
+    )
+    results.append(
+        Result("commit (commit)", name, seconds, 1, commits=len(few), peak_bytes=peak)
+    )
+    results.append(bench_end_to_end(name, contribs, git, runs, scratch))
+    return results
+
+
+def bench_end_to_end(
+    name: str, contribs: List[Contribution], git: GitHub, runs: int, scratch: str
+) -> Result:
+    """
+    Renders, counts the dummy repository, computes the deltas and incrementally rewrites and pushes the dummy repository,
+    against a local bare "remote" (reset to a single seed commit before every run) and a cached mirror of it.
+    """
+    weeks = len(contribs) // 7
+    # laid out like a fake-github root, so the mirror is checked against the remote it's expected to come from
+    git.git_url = os.path.join(scratch, "remotes")
+    remote = git.remote_url(REPO)
+    assert remote is not None
+    cache_dir = os.path.join(scratch, "cache")
+    work_dir = os.path.join(scratch, "work")
+    subprocess.run(
+        ["git", "init", "--quiet", "--bare", "-b", "main", remote], check=True
+    )
+    seed = write_commits(
+        [(int(contribs[-1].date.timestamp()), "seed")], NAME, EMAIL, remote
+    )
+    assert seed is not None, "no seed commit was written"
+    git.mirror_cache = MirrorCache(cache_dir)
+    mirror = git.mirror_cache.mirror_path(git.full_repo_name(REPO))
+    subprocess.run(["git", "clone", "--quiet", "--bare", remote, mirror], check=True)
+    pushed = {"commits": 0}
+
+    def reset():
+        for path in (remote, mirror):
+            subprocess.run(
+                ["git", "update-ref", "refs/heads/main", seed], cwd=path, check=True
+            )
+        os.makedirs(work_dir, exist_ok=True)
+
+    def run():
+        window = render(weeks)
+        dummy = git.count_commits(mirror)
+        deltas = git.calc_necessary_contrib_deltas(
+            window.buf[::-1], REPO, contribs, dummy_contribs=dummy
+        )
+        # make_necessary_commits reports every day it commits on, which would drown out the results
+        with contextlib.redirect_stdout(io.StringIO()):
+            git.make_necessary_commits(
+                REPO,
+                deltas,
+                NAME,
+                EMAIL,
+                Visibility.PUBLIC,
+                CommitBackend.PACK,
+                incremental=True,
+                work_dir=work_dir,
+                dummy_contribs=dummy,
+            )
+        pushed["commits"] = sum(max(delta.count, 0) for delta in deltas)
+
+    seconds, peak = measure(run, runs, setup=reset)
+    assert rev_parse(remote) != seed, "end-to-end run didn't push anything"
+    git.mirror_cache = git.git_url = None
+    return Result(
+        "end-to-end",
+        name,
+        seconds,
+        runs,
+        cells=weeks * 7,
+        commits=pushed["commits"],
+        peak_bytes=peak,
+    )
+
+
+def environment() -> Dict[str, Any]:
+    head = subprocess.run(
+        ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+    ).stdout.strip()
+    git_version = subprocess.run(
+        ["git", "--version"], capture_output=True, text=True
+    ).stdout.strip()
+    return {
+        "timestamp": datetime.datetime.now(datetime.UTC).isoformat(),
+        "revision": head,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": git_version,
+    }
+
+
+def print_results(results: List[Result], baseline: Dict[Tuple[str, str], float]):
+    header = [
+        "benchmark",
+        "calendar",
+        "median",
+        "cells/s",
+        "commits/s",
+        "peak",
+        "vs baseline",
+    ]
+    rows = []
+
+    for result in results:
+        row = result.as_dict()
+        previous = baseline.get((result.name, result.calendar))
+        rows.append(
+            [
+                result.name,
+                result.calendar,
+                f"{result.seconds * 1000:.2f}ms",
+                f"{row['cells_per_s']:,.0f}" if row["cells_per_s"] else "-",
+                f"{row['commits_per_s']:,.0f}" if row["commits_per_s"] else "-",
+                f"{result.peak_bytes / 1024:,.0f}KiB",
+                f"{previous / result.seconds:.2f}x" if previous else "-",
+            ]
+        )
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+
+    for row in [header, *rows]:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+@app.command()
+def main(
+    output: Annotated[
+        str,
+        typer.Option(
+            help="Where to write the results (as JSON), to compare against later runs."
+        ),
+    ] = "benchmark-results.json",
+    baseline: Annotated[
+        str,
+        typer.Option(
+            help="Results of a previous run (as written to --output) to report speedups against."
+        ),
+    ] = "",
+    runs: Annotated[
+        int,
+        typer.Option(
+            help="Number of timed runs of each benchmark (the median is reported)."
+        ),
+    ] = 5,
+    calendars: Annotated[
+        List[str],
+        typer.Option(
+            "--calendar", help=f"Calendars to benchmark ({', '.join(CALENDARS)})."
+        ),
+    ] = list(CALENDARS),
+):
+    """
+    Benchmarks each stage of painting (rendering, layout, delta computation, writing commits) and the whole render → delta → commit → push path,
+    over synthetic contribution calendars.
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        # keep `git config --global` (used by GitHub) away from the real global config
+        os.environ["GIT_CONFIG_GLOBAL"] = os.path.join(scratch, "gitconfig")
+        git = GitHub("benchmark", transport=LocalTransport())
+        results: List[Result] = []
+
+        for name in calendars:
+            calendar_scratch = os.path.join(scratch, name)
+            os.makedirs(calendar_scratch)
+            results += bench_calendar(
+                name, CALENDARS[name](), git, runs, calendar_scratch
+            )
+
+    previous: Dict[Tuple[str, str], float] = {}
+
+    if baseline:
+        with open(baseline) as f:
+            previous = {
+                (r["name"], r["calendar"]): r["seconds"]
+                for r in json.load(f)["results"]
+            }
+
+    print_results(results, previous)
+
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "environment": environment(),
+                "results": [result.as_dict() for result in results],
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,93 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+import typer
+
+from typing import List
+from typing_extensions import Annotated
+
+app = typer.Typer()
+
+# modules only some commands need, which importing the CLI (e.g. for `--help`) shouldn't pay for
+HEAVY_MODULES = [
+    "numpy",
+    "PIL",
+    "dateutil",
+    "http.client",
+    "ssl",
+    "hashlib",
+    "multiprocessing",
+    "src.batch",
+    "src.fake",
+    "src.pack",
+    "src.pipeline",
+]
+
+
+def import_time(statement: str, runs: int) -> float:
+    """
+    Returns the median wall time of a fresh interpreter running `statement`.
+    """
+    times: List[float] = []
+
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def loaded_modules(statement: str) -> List[str]:
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"{statement}; import json, sys; print(json.dumps(sorted(sys.modules)))",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@app.command()
+def main(
+    budget: Annotated[
+        float,
+        typer.Option(
+            help="Milliseconds importing the CLI may take on top of importing typer."
+        ),
+    ] = 100,
+    runs: Annotated[
+        int,
+        typer.Option(help="Number of timed imports of each (the median is reported)."),
+    ] = 10,
+):
+    """
+    Checks that importing the CLI stays cheap: that it doesn't pull in modules only some commands need,
+    and that it takes at most `budget` milliseconds more than importing typer (which the CLI can't start without).
+    """
+    loaded = set(loaded_modules("import main"))
+    eager = [module for module in HEAVY_MODULES if module in loaded]
+
+    typer_time = import_time("import typer", runs)
+    main_time = import_time("import main", runs)
+    overhead = (main_time - typer_time) * 1000
+
+    print(f"import typer: {typer_time * 1000:.1f}ms")
+    print(
+        f"import main:  {main_time * 1000:.1f}ms ({overhead:+.1f}ms, budget {budget:.0f}ms)"
+    )
+
+    if eager:
+        print(f"Imported eagerly: {', '.join(eager)}")
+
+    if eager or overhead > budget:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,28 +1,33 @@
 import datetime
-import math
 import typer
 
-from typing import List
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
 from typing_extensions import Annotated
 
-from src.fonts.default import nitram_micro_mono_CP437
-from src.github import GitHub, Contribution, Visibility
-from src.window import Window
-from src.util import (
-    next_saturday_of_date,
-    sunday_of_date,
-    next_saturday,
-    prev_sunday_52_weeks_ago,
-    HAlign,
-    VAlign,
-    Color,
-    Pixel,
-)
+# only what the command table needs (option types and defaults), each command imports the rest of what it uses when it runs
+from src.constants import GITHUB_API_URL
+from src.fit import Overflow
+from src.fonts import DEFAULT_FONT
+from src.github import CommitBackend, Visibility
+from src.image import Dither
+from src.transport import TransportType
+from src.util import HAlign, VAlign
+
+if TYPE_CHECKING:
+    from collections import defaultdict
+
+    from src.github import Contribution, GitHub
+    from src.window import Window
 
 app = typer.Typer()
 
 
-def print_contribs(contribs: List[Contribution], width: int, height: int = 7):
+def print_contribs(contribs: List["Contribution"], width: int, height: int = 7):
+    from src.deltas import contribution_level
+    from src.render import write_ansi
+    from src.util import Color, Pixel
+    from src.window import Window
+
     window = Window(
         width=width,
         height=height,
@@ -43,17 +48,120 @@ def print_contribs(contribs: List[Contribution], width: int, height: int = 7):
 
     # experimentally, this seems to be how the graph is colored
     for i, contrib in enumerate(reversed(contribs)):
-        if contrib.count >= max_contrib - quarter:
-            window.buf[i] = Pixel(Color(4))
-        elif contrib.count >= max_contrib - 2 * quarter:
-            window.buf[i] = Pixel(Color(3))
-        elif contrib.count >= max_contrib - 3 * quarter:
-            window.buf[i] = Pixel(Color(2))
-        elif contrib.count >= min_contrib:
-            window.buf[i] = Pixel(Color(1))
-        else:
-            window.buf[i] = Pixel(Color(0))
-    print(window)
+        window.buf[i] = contribution_level(contrib.count, max_contrib, min_contrib)
+    write_ansi(window)
+
+
+def paint(
+    git: "GitHub",
+    render: Callable[[], "Window"],
+    user: str,
+    git_name: str,
+    git_email: str,
+    repo: str,
+    visibility: Visibility,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    dry_run: bool,
+    commit_backend: CommitBackend,
+    incremental: bool,
+    optimize: bool,
+    preview_file: str = "",
+):
+    """
+    Makes the commits needed for the contribution graph of `user` to show what `render` draws (pictured in `preview_file`, if given).
+
+    Looking up the token user, fetching the calendar, counting the existing dummy commits and rendering only depend on each other where noted,
+    so they run concurrently (see `Pipeline`).
+    """
+    from src.pipeline import Pipeline
+    from src.render import write_ansi, write_preview
+
+    def identity() -> Tuple[str, str, str]:
+        if user and git_name and git_email:
+            return user, git_name, git_email
+
+        github_user = git.get_user()
+        return (
+            user or github_user["login"],
+            git_name or github_user["name"],
+            git_email or github_user["email"],
+        )
+
+    def deltas(
+        contribs: List["Contribution"],
+        dummy: "defaultdict[int, int]",
+        window: "Window",
+    ) -> List["Contribution"]:
+        write_ansi(window)
+        deltas = git.calc_necessary_contrib_deltas(
+            window.buf[::-1], repo, contribs, optimize=optimize, dummy_contribs=dummy
+        )
+        print("Commit delta mask (darker=more commits, lighter=less):")
+        print_contribs(deltas, window.width)
+        return deltas
+
+    def commit(
+        deltas: List["Contribution"],
+        identity: Tuple[str, str, str],
+        dummy: "defaultdict[int, int]",
+    ):
+        login, name, email = identity
+        changed = git.make_necessary_commits(
+            repo,
+            deltas,
+            name,
+            email,
+            visibility,
+            commit_backend,
+            incremental,
+            dummy_contribs=dummy,
+        )
+
+        # our own commits change the calendar, so don't trust what we cached for those days
+        if changed and git.calendar_cache:
+            git.calendar_cache.invalidate(login, changed)
+
+    pipeline = Pipeline()
+    pipeline.add("identity", identity)
+
+    # note: contribs are in reverse order (most recent first)
+    if user:
+        pipeline.add("contribs", lambda: git.get_user_contributions(user, start, end))
+    else:
+        pipeline.add(
+            "contribs",
+            lambda identity: git.get_user_contributions(identity[0], start, end),
+            after=["identity"],
+        )
+
+    # repos without an owner belong to the token user, which needs to be looked up first
+    pipeline.add(
+        "dummy",
+        lambda **_: git.dummy_repo_contributions(repo),
+        after=[] if "/" in repo else ["identity"],
+    )
+    pipeline.add("window", render)
+
+    if preview_file:
+        pipeline.add(
+            "preview",
+            lambda window: write_preview(window, preview_file),
+            after=["window"],
+        )
+    pipeline.add("deltas", deltas, after=["contribs", "dummy", "window"])
+
+    if not dry_run:
+        pipeline.add("commit", commit, after=["deltas", "identity", "dummy"])
+
+    pipeline.run()
+
+    if preview_file:
+        print(f"Preview written to {preview_file}")
+
+    if dry_run:
+        print("Dry run, not committing or pushing to GitHub.")
+    print(f"Stage timings: {pipeline.summary()}")
 
 
 @app.command()
@@ -73,20 +181,27 @@ def simulate(
         ),
     ],
     start: Annotated[
-        datetime.datetime,
+        Optional[datetime.datetime],
         typer.Option(
-            help="The start of the date range to generate the contribution banner for (will be rounded to the start of the previous Sunday)",
+            help="The start of the date range to generate the contribution banner for (will be rounded to the start of the previous Sunday, defaults to 52 weeks before the end)",
             envvar="INPUT_START",
         ),
-    ] = prev_sunday_52_weeks_ago,
+    ] = None,
     end: Annotated[
-        datetime.datetime,
+        Optional[datetime.datetime],
         typer.Option(
-            help="The end of the date range to generate the contribution banner for (will be rounded to the start of next Saturday)",
+            help="The end of the date range to generate the contribution banner for (will be rounded to the start of next Saturday, defaults to next Saturday)",
             envvar="INPUT_END",
         ),
-    ] = next_saturday,
+    ] = None,
 ):
+    import math
+
+    from src.github import GitHub
+    from src.util import next_saturday, prev_sunday_52_weeks_ago
+
+    start = start or prev_sunday_52_weeks_ago()
+    end = end or next_saturday()
     git = GitHub(token)
     contribs = git.get_user_contributions(user, start, end)
     width = math.ceil((end - start).days / 7)
@@ -145,19 +260,19 @@ def draw(
         ),
     ] = Visibility.PUBLIC,
     start: Annotated[
-        datetime.datetime,
+        Optional[datetime.datetime],
         typer.Option(
-            help="The start of the date range to generate the contribution banner for (will be rounded to the start of the previous Sunday).",
+            help="The start of the date range to generate the contribution banner for (will be rounded to the start of the previous Sunday, defaults to 52 weeks before the end).",
             envvar="INPUT_START",
         ),
-    ] = prev_sunday_52_weeks_ago,
+    ] = None,
     end: Annotated[
-        datetime.datetime,
+        Optional[datetime.datetime],
         typer.Option(
-            help="The end of the date range to generate the contribution banner for (will be rounded to the start of next Saturday).",
+            help="The end of the date range to generate the contribution banner for (will be rounded to the start of next Saturday, defaults to next Saturday).",
             envvar="INPUT_END",
         ),
-    ] = next_saturday,
+    ] = None,
     separator: Annotated[
         str,
         typer.Option(
@@ -165,6 +280,27 @@ def draw(
             envvar="INPUT_SEPARATOR",
         ),
     ] = "|",
+    font: Annotated[
+        str,
+        typer.Option(
+            help="Name of the font to draw the text with (one of the compiled fonts in src/fonts), or the path to a compiled font file.",
+            envvar="INPUT_FONT",
+        ),
+    ] = DEFAULT_FONT,
+    auto_fit: Annotated[
+        bool,
+        typer.Option(
+            help="Search the available fonts, letter spacings and paddings (starting with the chosen ones) for the most legible layout that fits the text in the window.",
+            envvar="INPUT_AUTO_FIT",
+        ),
+    ] = False,
+    overflow: Annotated[
+        Overflow,
+        typer.Option(
+            help="What to do with text that doesn't fit even after auto-fitting ('truncate' drops the characters that don't fit, 'clip' lets the window cut them off).",
+            envvar="INPUT_OVERFLOW",
+        ),
+    ] = Overflow.TRUNCATE,
     inverse: Annotated[
         bool,
         typer.Option(
@@ -214,6 +350,97 @@ def draw(
             envvar="INPUT_DRY_RUN",
         ),
     ] = False,
+    commit_backend: Annotated[
+        CommitBackend,
+        typer.Option(
+            help="How to write the dummy commits ('fast-import' streams every commit through a single git process, 'pack' writes a packfile in-process without spawning git, 'commit' runs one `git commit` per commit).",
+            envvar="INPUT_COMMIT_BACKEND",
+        ),
+    ] = CommitBackend.FAST_IMPORT,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            help="Whether to keep the unchanged prefix of the dummy repository's history and only rewrite from the first differing day (instead of deleting and recreating the repository).",
+            envvar="INPUT_INCREMENTAL",
+        ),
+    ] = False,
+    cache_dir: Annotated[
+        str,
+        typer.Option(
+            help="Directory to keep a bare mirror of the dummy repository and the contribution calendar in between runs, so only new commits and recent days need to be fetched (disabled if empty).",
+            envvar="INPUT_CACHE_DIR",
+        ),
+    ] = "",
+    cache_max_size: Annotated[
+        int,
+        typer.Option(
+            help="Maximum size of the mirror cache directory (in MB), least recently used mirrors are evicted beyond this.",
+            envvar="INPUT_CACHE_MAX_SIZE",
+        ),
+    ] = 512,
+    calendar_horizon: Annotated[
+        int,
+        typer.Option(
+            help="Number of days after which cached contribution counts are considered final and are no longer re-fetched.",
+            envvar="INPUT_CALENDAR_HORIZON",
+        ),
+    ] = 7,
+    transport: Annotated[
+        TransportType,
+        typer.Option(
+            help="How to call the GitHub API ('http' uses a pooled native client, 'gh' shells out to the gh cli).",
+            envvar="INPUT_TRANSPORT",
+        ),
+    ] = TransportType.HTTP,
+    api_url: Annotated[
+        str,
+        typer.Option(
+            help="Base URL of the GitHub REST API (for GitHub Enterprise, or a local stub server).",
+            envvar="INPUT_API_URL",
+        ),
+    ] = GITHUB_API_URL,
+    git_url: Annotated[
+        str,
+        typer.Option(
+            help="Base URL to clone and push repositories from and to with plain git, as {git_url}/{owner}/{repo}.git (e.g. the root of a fake-github server), instead of using the gh cli (which is used if empty).",
+            envvar="INPUT_GIT_URL",
+        ),
+    ] = "",
+    profile: Annotated[
+        bool,
+        typer.Option(
+            help="Whether to print how long each stage, API call and git/gh process took, with counts of the API calls made, commits written and bytes pushed.",
+            envvar="INPUT_PROFILE",
+        ),
+    ] = False,
+    trace_file: Annotated[
+        str,
+        typer.Option(
+            help="Path to write the profiled spans and counters to, as a Chrome trace (viewable in chrome://tracing, Perfetto or speedscope).",
+            envvar="INPUT_TRACE_FILE",
+        ),
+    ] = "",
+    sample_file: Annotated[
+        str,
+        typer.Option(
+            help="Path to write samples of the Python stacks of every thread to (taken every 5ms, in the collapsed format of flamegraph.pl and speedscope).",
+            envvar="INPUT_SAMPLE_FILE",
+        ),
+    ] = "",
+    preview_file: Annotated[
+        str,
+        typer.Option(
+            help="Path to write a picture of the banner to: an image mimicking the contribution graph if it ends in .svg or .png, terminal output otherwise.",
+            envvar="INPUT_PREVIEW_FILE",
+        ),
+    ] = "",
+    optimize: Annotated[
+        bool,
+        typer.Option(
+            help="Whether to search for the quartile scale that produces the desired shades with the fewest dummy commits.",
+            envvar="INPUT_OPTIMIZE",
+        ),
+    ] = False,
 ):
     """
     Given a GitHub user, a string of text, we generate fake Git commits to display the desired text on the contribution graph within a given range.
@@ -225,6 +452,25 @@ def draw(
     Based on one GitHub dev comment (https://github.com/orgs/community/discussions/23261#discussioncomment-3239758), the shade is determined by the distribution of commits in a given time-period, where each shade matches a given quartile.
     The "quartile's" are not _actual_ quartiles however, the ranges seem to be divided by taking the maximum number of commits on a single day in a given time period, divided by 4.
     """
+    import math
+
+    from src.fit import auto_fit as find_fit
+    from src.fonts import available_fonts, load_font
+    from src.github import GitHub
+    from src.profiling import profiler
+    from src.transport import make_transport
+    from src.util import (
+        Color,
+        Pixel,
+        next_saturday,
+        next_saturday_of_date,
+        prev_sunday_52_weeks_ago,
+        sunday_of_date,
+    )
+    from src.window import Window
+
+    start = start or prev_sunday_52_weeks_ago()
+    end = end or next_saturday()
     empty_pixel = Pixel(Color(1) if not inverse else Color(4))
     height = 7
 
@@ -232,44 +478,513 @@ def draw(
         end = next_saturday_of_date(end)
         start = sunday_of_date(start)
     weeks = math.ceil((end - start).days / 7)
-    window = Window(
-        width=weeks,
-        height=height,
-        empty_pixel=empty_pixel,
-        padding=padding,
+    git = GitHub(
+        token,
+        cache_dir=cache_dir or None,
+        cache_max_bytes=cache_max_size * 1024 * 1024,
+        transport=make_transport(transport, token, api_url),
+        calendar_horizon_days=calendar_horizon,
+        git_url=git_url or None,
     )
-    git = GitHub(token)
 
-    if not user or not git_name or not git_email:
-        github_user = git.get_user()
-        user = user or github_user["login"]
-        git_name = git_name or github_user["name"]
-        git_email = git_email or github_user["email"]
+    def render() -> Window:
+        fitted_text, text_font, fitted_padding = text, load_font(font), padding
 
-    # note: contribs are in reverse order (most recent first)
-    contribs = git.get_user_contributions(
-        user,
-        start,
-        end,
+        if auto_fit:
+            fit = find_fit(
+                text,
+                weeks,
+                height,
+                padding,
+                fonts=[font] + [name for name in available_fonts() if name != font],
+                overflow=overflow,
+            )
+            print(f"Auto-fit: {fit}")
+            fitted_text, text_font, fitted_padding = fit.text, fit.font, fit.padding
+
+        window = Window(
+            width=weeks,
+            height=height,
+            empty_pixel=empty_pixel,
+            padding=fitted_padding,
+        )
+        window.draw_text(
+            fitted_text,
+            text_font,
+            repeat=repeat,
+            separator=separator,
+            inverse=inverse,
+            h_align=h_align,
+            v_align=v_align,
+        )
+        return window
+
+    with profiler.session(profile, trace_file, sample_file):
+        paint(
+            git,
+            render,
+            user,
+            git_name,
+            git_email,
+            repo,
+            visiblity,
+            start,
+            end,
+            dry_run,
+            commit_backend,
+            incremental,
+            optimize,
+            preview_file,
+        )
+
+
+@app.command()
+def draw_image(
+    image: Annotated[
+        str,
+        typer.Argument(
+            help="Path of the PNG or PGM image to display on the contribution graph (scaled to 7 rows by the number of weeks).",
+            envvar="INPUT_IMAGE",
+        ),
+    ],
+    token: Annotated[
+        str,
+        typer.Option(
+            help="GitHub personal access token (used for creating/deleting repos, pushing commits, and getting user contribution history).",
+            envvar="INPUT_TOKEN",
+        ),
+    ],
+    user: Annotated[
+        str,
+        typer.Option(
+            help="GitHub user to generate the contribution banner for (e.g. 'tbrockman'). Used to retrieve existing contributions. Defaults to the GH user of the token.",
+            envvar="INPUT_USER",
+        ),
+    ] = "",
+    git_name: Annotated[
+        str,
+        typer.Option(
+            help="Name for git user (defaults to name in GitHub profile of token user).",
+            envvar="INPUT_GIT_NAME",
+        ),
+    ] = "",
+    git_email: Annotated[
+        str,
+        typer.Option(
+            help="Email for git user (defaults to email in GitHub profile of token user).",
+            envvar="INPUT_GIT_EMAIL",
+        ),
+    ] = "",
+    repo: Annotated[
+        str,
+        typer.Option(
+            help="The name of the repo to create fake commits in (must be owned by the user). Also used as the name of the subdirectory to initialize the repo in. Specify an organization name to create the repo under an organization (ex. 'org/github-painted').",
+            envvar="INPUT_REPO",
+        ),
+    ] = "github-painted",
+    visiblity: Annotated[
+        Visibility,
+        typer.Option(
+            help="The visibility of the generated GitHub repository.",
+            envvar="INPUT_VISIBILITY",
+        ),
+    ] = Visibility.PUBLIC,
+    start: Annotated[
+        Optional[datetime.datetime],
+        typer.Option(
+            help="The start of the date range to generate the contribution banner for (will be rounded to the start of the previous Sunday, defaults to 52 weeks before the end).",
+            envvar="INPUT_START",
+        ),
+    ] = None,
+    end: Annotated[
+        Optional[datetime.datetime],
+        typer.Option(
+            help="The end of the date range to generate the contribution banner for (will be rounded to the start of next Saturday, defaults to next Saturday).",
+            envvar="INPUT_END",
+        ),
+    ] = None,
+    dither: Annotated[
+        Dither,
+        typer.Option(
+            help="How to spread the image's shades over the four contribution colors ('bayer' uses ordered dithering, 'none' rounds each cell to the nearest color).",
+            envvar="INPUT_DITHER",
+        ),
+    ] = Dither.NONE,
+    inverse: Annotated[
+        bool,
+        typer.Option(
+            help="Whether to invert the image (lighter pixels getting more contributions).",
+            envvar="INPUT_INVERSE",
+        ),
+    ] = False,
+    force_date: Annotated[
+        bool,
+        typer.Option(
+            help="Whether to force the chosen date range without applying the default rounding.",
+            envvar="INPUT_FORCE_DATE",
+        ),
+    ] = False,
+    dry_run: Annotated[
+        bool,
+        typer.Option(
+            help="Whether or not to actually push the commits to the remote repository (useful for testing).",
+            envvar="INPUT_DRY_RUN",
+        ),
+    ] = False,
+    commit_backend: Annotated[
+        CommitBackend,
+        typer.Option(
+            help="How to write the dummy commits ('fast-import' streams every commit through a single git process, 'pack' writes a packfile in-process without spawning git, 'commit' runs one `git commit` per commit).",
+            envvar="INPUT_COMMIT_BACKEND",
+        ),
+    ] = CommitBackend.FAST_IMPORT,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            help="Whether to keep the unchanged prefix of the dummy repository's history and only rewrite from the first differing day (instead of deleting and recreating the repository).",
+            envvar="INPUT_INCREMENTAL",
+        ),
+    ] = False,
+    cache_dir: Annotated[
+        str,
+        typer.Option(
+            help="Directory to keep a bare mirror of the dummy repository and the contribution calendar in between runs, so only new commits and recent days need to be fetched (disabled if empty).",
+            envvar="INPUT_CACHE_DIR",
+        ),
+    ] = "",
+    cache_max_size: Annotated[
+        int,
+        typer.Option(
+            help="Maximum size of the mirror cache directory (in MB), least recently used mirrors are evicted beyond this.",
+            envvar="INPUT_CACHE_MAX_SIZE",
+        ),
+    ] = 512,
+    calendar_horizon: Annotated[
+        int,
+        typer.Option(
+            help="Number of days after which cached contribution counts are considered final and are no longer re-fetched.",
+            envvar="INPUT_CALENDAR_HORIZON",
+        ),
+    ] = 7,
+    transport: Annotated[
+        TransportType,
+        typer.Option(
+            help="How to call the GitHub API ('http' uses a pooled native client, 'gh' shells out to the gh cli).",
+            envvar="INPUT_TRANSPORT",
+        ),
+    ] = TransportType.HTTP,
+    api_url: Annotated[
+        str,
+        typer.Option(
+            help="Base URL of the GitHub REST API (for GitHub Enterprise, or a local stub server).",
+            envvar="INPUT_API_URL",
+        ),
+    ] = GITHUB_API_URL,
+    git_url: Annotated[
+        str,
+        typer.Option(
+            help="Base URL to clone and push repositories from and to with plain git, as {git_url}/{owner}/{repo}.git (e.g. the root of a fake-github server), instead of using the gh cli (which is used if empty).",
+            envvar="INPUT_GIT_URL",
+        ),
+    ] = "",
+    profile: Annotated[
+        bool,
+        typer.Option(
+            help="Whether to print how long each stage, API call and git/gh process took, with counts of the API calls made, commits written and bytes pushed.",
+            envvar="INPUT_PROFILE",
+        ),
+    ] = False,
+    trace_file: Annotated[
+        str,
+        typer.Option(
+            help="Path to write the profiled spans and counters to, as a Chrome trace (viewable in chrome://tracing, Perfetto or speedscope).",
+            envvar="INPUT_TRACE_FILE",
+        ),
+    ] = "",
+    sample_file: Annotated[
+        str,
+        typer.Option(
+            help="Path to write samples of the Python stacks of every thread to (taken every 5ms, in the collapsed format of flamegraph.pl and speedscope).",
+            envvar="INPUT_SAMPLE_FILE",
+        ),
+    ] = "",
+    preview_file: Annotated[
+        str,
+        typer.Option(
+            help="Path to write a picture of the banner to: an image mimicking the contribution graph if it ends in .svg or .png, terminal output otherwise.",
+            envvar="INPUT_PREVIEW_FILE",
+        ),
+    ] = "",
+    optimize: Annotated[
+        bool,
+        typer.Option(
+            help="Whether to search for the quartile scale that produces the desired shades with the fewest dummy commits.",
+            envvar="INPUT_OPTIMIZE",
+        ),
+    ] = False,
+):
+    """
+    Given a GitHub user and an image, we generate fake Git commits to display the image on the contribution graph within a given range.
+
+    The image is scaled to fill the graph and quantized to its four colors (darker pixels getting more contributions).
+    """
+    import math
+
+    from src.github import GitHub
+    from src.image import draw_image as draw_image_file
+    from src.profiling import profiler
+    from src.transport import make_transport
+    from src.util import (
+        Color,
+        Pixel,
+        next_saturday,
+        next_saturday_of_date,
+        prev_sunday_52_weeks_ago,
+        sunday_of_date,
     )
-    window.draw_text(
-        text,
-        nitram_micro_mono_CP437,
-        repeat=repeat,
-        separator=separator,
-        inverse=inverse,
-        h_align=h_align,
-        v_align=v_align,
+    from src.window import Window
+
+    start = start or prev_sunday_52_weeks_ago()
+    end = end or next_saturday()
+
+    if not force_date:
+        end = next_saturday_of_date(end)
+        start = sunday_of_date(start)
+    weeks = math.ceil((end - start).days / 7)
+    git = GitHub(
+        token,
+        cache_dir=cache_dir or None,
+        cache_max_bytes=cache_max_size * 1024 * 1024,
+        transport=make_transport(transport, token, api_url),
+        calendar_horizon_days=calendar_horizon,
+        git_url=git_url or None,
     )
-    print(window)
-    deltas = git.calc_necessary_contrib_deltas(window.buf[::-1], repo, contribs)
-    print("Commit delta mask (darker=more commits, lighter=less):")
-    print_contribs(deltas, weeks)
 
-    if not dry_run:
-        git.make_necessary_commits(repo, deltas, git_name, git_email, visiblity)
-    else:
-        print("Dry run, not committing or pushing to GitHub.")
+    def render() -> Window:
+        window = Window(
+            width=weeks,
+            height=7,
+            empty_pixel=Pixel(Color(1)),
+        )
+        draw_image_file(window, image, dither=dither, inverse=inverse)
+        return window
+
+    with profiler.session(profile, trace_file, sample_file):
+        paint(
+            git,
+            render,
+            user,
+            git_name,
+            git_email,
+            repo,
+            visiblity,
+            start,
+            end,
+            dry_run,
+            commit_backend,
+            incremental,
+            optimize,
+            preview_file,
+        )
+
+
+@app.command()
+def batch(
+    manifest: Annotated[
+        str,
+        typer.Argument(
+            help='Path of a JSON manifest of the banners to paint, of the form {"defaults": {...}, "instances": [{"text": ..., "user": ..., "token_env": ...}, ...]} (instances take the same settings as the draw command).',
+            envvar="INPUT_MANIFEST",
+        ),
+    ],
+    token: Annotated[
+        str,
+        typer.Option(
+            help="GitHub personal access token for instances that don't name their own with `token_env`.",
+            envvar="INPUT_TOKEN",
+        ),
+    ] = "",
+    jobs: Annotated[
+        int,
+        typer.Option(
+            help="Number of worker processes committing and pushing dummy repositories at once.",
+            envvar="INPUT_JOBS",
+        ),
+    ] = 4,
+    dry_run: Annotated[
+        bool,
+        typer.Option(
+            help="Whether or not to actually push the commits to the remote repositories (useful for testing).",
+            envvar="INPUT_DRY_RUN",
+        ),
+    ] = False,
+    cache_dir: Annotated[
+        str,
+        typer.Option(
+            help="Directory to keep bare mirrors of the dummy repositories and the contribution calendars in between runs (disabled if empty).",
+            envvar="INPUT_CACHE_DIR",
+        ),
+    ] = "",
+    cache_max_size: Annotated[
+        int,
+        typer.Option(
+            help="Maximum size of the mirror cache directory (in MB), least recently used mirrors are evicted beyond this.",
+            envvar="INPUT_CACHE_MAX_SIZE",
+        ),
+    ] = 512,
+    calendar_horizon: Annotated[
+        int,
+        typer.Option(
+            help="Number of days after which cached contribution counts are considered final and are no longer re-fetched.",
+            envvar="INPUT_CALENDAR_HORIZON",
+        ),
+    ] = 7,
+    transport: Annotated[
+        TransportType,
+        typer.Option(
+            help="How to call the GitHub API ('http' uses a pooled native client, 'gh' shells out to the gh cli).",
+            envvar="INPUT_TRANSPORT",
+        ),
+    ] = TransportType.HTTP,
+    api_url: Annotated[
+        str,
+        typer.Option(
+            help="Base URL of the GitHub REST API (for GitHub Enterprise, or a local stub server).",
+            envvar="INPUT_API_URL",
+        ),
+    ] = GITHUB_API_URL,
+    git_url: Annotated[
+        str,
+        typer.Option(
+            help="Base URL to clone and push repositories from and to with plain git, as {git_url}/{owner}/{repo}.git (e.g. the root of a fake-github server), instead of using the gh cli (which is used if empty).",
+            envvar="INPUT_GIT_URL",
+        ),
+    ] = "",
+    profile: Annotated[
+        bool,
+        typer.Option(
+            help="Whether to print how long each stage, API call and git/gh process took, with counts of the API calls made, commits written and bytes pushed.",
+            envvar="INPUT_PROFILE",
+        ),
+    ] = False,
+    trace_file: Annotated[
+        str,
+        typer.Option(
+            help="Path to write the profiled spans and counters to, as a Chrome trace (viewable in chrome://tracing, Perfetto or speedscope).",
+            envvar="INPUT_TRACE_FILE",
+        ),
+    ] = "",
+    sample_file: Annotated[
+        str,
+        typer.Option(
+            help="Path to write samples of the Python stacks of every thread to (taken every 5ms, in the collapsed format of flamegraph.pl and speedscope).",
+            envvar="INPUT_SAMPLE_FILE",
+        ),
+    ] = "",
+    preview_file: Annotated[
+        str,
+        typer.Option(
+            help="Path to write a picture of each banner to (an image mimicking the contribution graph if it ends in .svg or .png, terminal output otherwise), where {user}, {repo} and {index} are replaced with those of its instance (e.g. previews/{user}-{repo}.svg).",
+            envvar="INPUT_PREVIEW_FILE",
+        ),
+    ] = "",
+):
+    """
+    Paints the contribution graphs of many users (or many repositories) from one process, sharing fonts, API clients and caches.
+    """
+    from src.batch import load_manifest, print_report, run_batch
+    from src.profiling import profiler
+
+    instances = load_manifest(manifest)
+
+    with profiler.session(profile, trace_file, sample_file):
+        results = run_batch(
+            instances,
+            token=token,
+            jobs=jobs,
+            dry_run=dry_run,
+            cache_dir=cache_dir or None,
+            cache_max_bytes=cache_max_size * 1024 * 1024,
+            calendar_horizon_days=calendar_horizon,
+            transport=transport,
+            api_url=api_url,
+            git_url=git_url or None,
+            preview_file=preview_file,
+        )
+        print_report(results)
+
+    if any(result.failed for result in results):
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def fake_github(
+    root: Annotated[
+        str,
+        typer.Argument(
+            help="Directory to keep the fake GitHub's repositories in (as bare repositories at <root>/<owner>/<repo>.git), served to git as --git-url file://<root>.",
+        ),
+    ],
+    port: Annotated[
+        int,
+        typer.Option(help="Port to serve the fake API on."),
+    ] = 8080,
+    host: Annotated[
+        str,
+        typer.Option(help="Address to serve the fake API on."),
+    ] = "127.0.0.1",
+    login: Annotated[
+        str,
+        typer.Option(help="Login of the user every token belongs to."),
+    ] = "octocat",
+    name: Annotated[
+        str,
+        typer.Option(help="Name of the token user."),
+    ] = "The Octocat",
+    email: Annotated[
+        str,
+        typer.Option(help="Email of the token user."),
+    ] = "octocat@example.com",
+    contributions: Annotated[
+        str,
+        typer.Option(
+            help='Path of a JSON file of other contributions the user should appear to have made, of the form {"2024-01-31": 3, ...}.',
+        ),
+    ] = "",
+    verbose: Annotated[
+        bool,
+        typer.Option(help="Whether to log every request."),
+    ] = False,
+):
+    """
+    Serves an offline stand-in for the GitHub API (and repositories to push to), so draw and batch can run end-to-end without a network.
+
+    Point them at it with --transport http --api-url http://<host>:<port> --git-url file://<root> (any token is accepted).
+    """
+    import json
+    import threading
+
+    from src.fake import FakeGitHub, serve as serve_fake
+
+    other_contributions = {}
+
+    if contributions:
+        with open(contributions) as f:
+            other_contributions = {
+                datetime.date.fromisoformat(day): count
+                for day, count in json.load(f).items()
+            }
+
+    fake = FakeGitHub(root, login, name, email, other_contributions)
+    server = serve_fake(fake, host, port, quiet=not verbose)
+    print(
+        f"Serving a fake GitHub for {login}, use --api-url http://{host}:{server.server_address[1]} --git-url file://{fake.root}"
+    )
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
 
 
 if __name__ == "__main__":
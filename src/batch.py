@@ -0,0 +1,455 @@
+import datetime
+import json
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import CalendarCache, MirrorCache
+from .constants import GITHUB_API_URL, GRAPHQL_MAX_CONCURRENT_QUERIES
+from .fit import Overflow, auto_fit
+from .fonts import DEFAULT_FONT, available_fonts, load_font
+from .github import CommitBackend, Contribution, GitHub, Visibility, initializer
+from .profiling import Span, profiler
+from .render import write_preview
+from .transport import TransportType, make_transport
+from .util import (
+    Color,
+    HAlign,
+    Pixel,
+    VAlign,
+    next_saturday,
+    next_saturday_of_date,
+    prev_sunday_52_weeks_ago,
+    rmtree_readonly,
+    sunday_of_date,
+)
+from .window import Window
+
+
+@dataclass
+class BatchInstance:
+    """
+    One banner to paint, as described by an entry of the batch manifest (the same settings as the `draw` command).
+
+    The token is read from the environment variable named by `token_env` (so manifests never contain secrets),
+    falling back to the token given to the `batch` command.
+    """
+
+    text: str
+    user: str = ""
+    token_env: str = ""
+    git_name: str = ""
+    git_email: str = ""
+    repo: str = "github-painted"
+    visibility: Visibility = Visibility.PUBLIC
+    start: Optional[datetime.datetime] = None  # 52 weeks before the end
+    end: Optional[datetime.datetime] = None  # next Saturday
+    force_date: bool = False
+    font: str = DEFAULT_FONT
+    auto_fit: bool = False
+    overflow: Overflow = Overflow.TRUNCATE
+    separator: str = "|"
+    inverse: bool = False
+    repeat: bool = False
+    padding: Tuple[int, int, int, int] = (0, 0, 0, 0)
+    h_align: HAlign = HAlign.CENTER
+    v_align: VAlign = VAlign.CENTER
+    commit_backend: CommitBackend = CommitBackend.FAST_IMPORT
+    incremental: bool = False
+    optimize: bool = False
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> "BatchInstance":
+        names = {f.name for f in fields(cls)}
+        unknown = set(entry) - names
+
+        if unknown:
+            raise ValueError(
+                f"Unknown batch manifest settings: {', '.join(sorted(unknown))}"
+            )
+
+        values = dict(entry)
+        converters = {
+            "visibility": Visibility,
+            "start": datetime.datetime.fromisoformat,
+            "end": datetime.datetime.fromisoformat,
+            "overflow": Overflow,
+            "padding": tuple,
+            "h_align": HAlign,
+            "v_align": VAlign,
+            "commit_backend": CommitBackend,
+        }
+
+        for name, convert in converters.items():
+            if name in values:
+                values[name] = convert(values[name])
+        return cls(**values)
+
+
+def load_manifest(path: str) -> List[BatchInstance]:
+    """
+    Reads a manifest of the form {"defaults": {...}, "instances": [{...}, ...]}, each instance overriding the shared defaults.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+
+    defaults = manifest.get("defaults", {})
+    return [
+        BatchInstance.from_dict(defaults | entry) for entry in manifest["instances"]
+    ]
+
+
+@dataclass
+class BatchResult:
+    user: str
+    repo: str
+    status: str = "pending"
+    commits: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+    failed: bool = False
+
+
+@dataclass
+class CommitJob:
+    """
+    Everything a worker process needs to compute and push the dummy commits of one instance.
+    """
+
+    token: str
+    user: str
+    git_name: str
+    git_email: str
+    repo: str
+    visibility: Visibility
+    cells: bytes
+    contribs: List[Contribution]
+    commit_backend: CommitBackend
+    incremental: bool
+    optimize: bool
+    dry_run: bool
+    cache_dir: Optional[str]
+    cache_max_bytes: Optional[int]
+    transport: TransportType
+    api_url: str
+    git_url: Optional[str]
+    profile: bool
+
+
+def run_commit_job(
+    job: CommitJob,
+) -> Tuple[
+    Optional[List[datetime.date]],
+    int,
+    float,
+    Optional[Tuple[List[Span], Dict[str, int]]],
+]:
+    """
+    Runs in a worker process: returns the days whose dummy commits changed (see `GitHub.make_necessary_commits`),
+    the number of dummy commits painted, how long it took and (if profiling) the spans and counters it recorded.
+    """
+    started = time.perf_counter()
+
+    if job.profile:
+        profiler.enable()
+
+    git = GitHub(
+        job.token,
+        cache_dir=job.cache_dir,
+        cache_max_bytes=job.cache_max_bytes,
+        transport=make_transport(job.transport, job.token, job.api_url),
+        git_url=job.git_url,
+    )
+    # counted once, for both the deltas and the days they change
+    dummy = git.dummy_repo_contributions(job.repo)
+    deltas = git.calc_necessary_contrib_deltas(
+        job.cells, job.repo, job.contribs, optimize=job.optimize, dummy_contribs=dummy
+    )
+    commits = sum(delta.count for delta in deltas if delta.count > 0)
+    changed = None
+
+    if not job.dry_run:
+        work_dir = tempfile.mkdtemp(prefix="github-paint-")
+
+        try:
+            changed = git.make_necessary_commits(
+                job.repo,
+                deltas,
+                job.git_name,
+                job.git_email,
+                job.visibility,
+                job.commit_backend,
+                job.incremental,
+                work_dir=work_dir,
+                dummy_contribs=dummy,
+            )
+        finally:
+            rmtree_readonly(work_dir)
+    return (
+        changed,
+        commits,
+        time.perf_counter() - started,
+        profiler.export() if job.profile else None,
+    )
+
+
+def render_instance(
+    instance: BatchInstance, start: datetime.datetime, end: datetime.datetime
+) -> Window:
+    weeks = math.ceil((end - start).days / 7)
+    text, font, padding = instance.text, load_font(instance.font), instance.padding
+
+    if instance.auto_fit:
+        fit = auto_fit(
+            text,
+            weeks,
+            7,
+            padding,
+            fonts=[instance.font]
+            + [name for name in available_fonts() if name != instance.font],
+            overflow=instance.overflow,
+        )
+        text, font, padding = fit.text, fit.font, fit.padding
+
+    window = Window(
+        width=weeks,
+        height=7,
+        empty_pixel=Pixel(Color(1) if not instance.inverse else Color(4)),
+        padding=padding,
+    )
+    window.draw_text(
+        text,
+        font,
+        repeat=instance.repeat,
+        separator=instance.separator,
+        inverse=instance.inverse,
+        h_align=instance.h_align,
+        v_align=instance.v_align,
+    )
+    return window
+
+
+def run_batch(
+    instances: List[BatchInstance],
+    token: str = "",
+    jobs: int = 4,
+    dry_run: bool = False,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = 512 * 1024 * 1024,
+    calendar_horizon_days: int = 7,
+    transport: TransportType = TransportType.HTTP,
+    api_url: str = GITHUB_API_URL,
+    git_url: Optional[str] = None,
+    preview_file: str = "",
+) -> List[BatchResult]:
+    """
+    Paints every instance of a batch from a single process.
+
+    Each distinct token gets one `GitHub` client (and so one API transport), all sharing one calendar cache.
+    Users are resolved, their calendars fetched and their banners rendered concurrently on threads (fonts are loaded once, see `load_font`),
+    then the dummy repositories are counted, committed and pushed by a bounded pool of `jobs` worker processes.
+
+    If `preview_file` is given, each banner is pictured at that path (formatted with the `user`, `repo` and `index` of its instance, see `write_preview`).
+    """
+    results = [BatchResult(instance.user, instance.repo) for instance in instances]
+    tokens: Dict[int, str] = {}
+
+    for i, instance in enumerate(instances):
+        instance_token = (
+            os.environ.get(instance.token_env, "") if instance.token_env else token
+        )
+
+        if instance_token:
+            tokens[i] = instance_token
+        else:
+            results[i].status = f"no token (set {instance.token_env or '--token'})"
+            results[i].failed = True
+
+    calendar_cache = (
+        CalendarCache(
+            os.path.join(cache_dir, "calendar.json"), horizon_days=calendar_horizon_days
+        )
+        if cache_dir
+        else None
+    )
+    clients = {
+        instance_token: GitHub(
+            instance_token,
+            cache_dir=cache_dir,
+            cache_max_bytes=cache_max_bytes,
+            transport=make_transport(transport, instance_token, api_url),
+            calendar_cache=calendar_cache,
+            git_url=git_url,
+        )
+        for instance_token in set(tokens.values())
+    }
+
+    def prepare(i: int) -> CommitJob:
+        instance = instances[i]
+        git = clients[tokens[i]]
+        started = time.perf_counter()
+        user, git_name, git_email = instance.user, instance.git_name, instance.git_email
+
+        if not user or not git_name or not git_email:
+            github_user = git.get_user()
+            user = user or github_user["login"]
+            git_name = git_name or github_user["name"]
+            git_email = git_email or github_user["email"]
+
+        results[i].user = user
+        start = instance.start or prev_sunday_52_weeks_ago()
+        end = instance.end or next_saturday()
+
+        if not instance.force_date:
+            end = next_saturday_of_date(end)
+            start = sunday_of_date(start)
+        contribs = git.get_user_contributions(user, start, end)
+        fetched = time.perf_counter()
+        window = render_instance(instance, start, end)
+
+        if preview_file:
+            write_preview(
+                window,
+                preview_file.format(
+                    user=user, repo=instance.repo.replace("/", "-"), index=i
+                ),
+            )
+        results[i].timings["fetch"] = fetched - started
+        results[i].timings["render"] = time.perf_counter() - fetched
+        return CommitJob(
+            token=tokens[i],
+            user=user,
+            git_name=git_name,
+            git_email=git_email,
+            repo=instance.repo,
+            visibility=instance.visibility,
+            cells=bytes(window.buf[::-1]),
+            contribs=contribs,
+            commit_backend=instance.commit_backend,
+            incremental=instance.incremental,
+            optimize=instance.optimize,
+            dry_run=dry_run,
+            cache_dir=cache_dir,
+            # workers share the cache, so one evicting a mirror another is using is avoided by enforcing its cap once they're all done
+            cache_max_bytes=None,
+            transport=transport,
+            api_url=api_url,
+            git_url=git_url,
+            profile=profiler.enabled,
+        )
+
+    commit_jobs: Dict[int, CommitJob] = {}
+
+    with ThreadPoolExecutor(max_workers=GRAPHQL_MAX_CONCURRENT_QUERIES) as pool:
+        futures = {
+            pool.submit(profiler.span("prepare", "batch", instance=i)(prepare), i): i
+            for i in tokens
+        }
+
+        for future in as_completed(futures):
+            i = futures[future]
+
+            try:
+                commit_jobs[i] = future.result()
+            except Exception as e:
+                results[i].status = f"failed to prepare: {e}"
+                results[i].failed = True
+
+    # two instances pushing to the same repository would overwrite each other
+    targets: Dict[str, int] = {}
+
+    for i in sorted(commit_jobs):
+        try:
+            target = clients[tokens[i]].full_repo_name(instances[i].repo)
+        except Exception as e:
+            results[i].status = f"failed to resolve repository: {e}"
+            results[i].failed = True
+            del commit_jobs[i]
+            continue
+
+        if target in targets:
+            results[i].status = (
+                f"skipped (same repository as instance {targets[target]})"
+            )
+            results[i].failed = True
+            del commit_jobs[i]
+        else:
+            targets[target] = i
+            # workers share the cache directory, whose mirrors are told apart by owner (and they don't need to look the owner up again)
+            commit_jobs[i].repo = target
+
+    # workers are spawned rather than forked, since this process has already started threads
+    pool = ProcessPoolExecutor(
+        max_workers=max(1, jobs),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+    )
+
+    try:
+        futures = {
+            pool.submit(run_commit_job, job): i for i, job in commit_jobs.items()
+        }
+
+        for future in as_completed(futures):
+            i = futures[future]
+            job = commit_jobs[i]
+
+            try:
+                changed, commits, elapsed, recorded = future.result()
+            except Exception as e:
+                results[i].status = f"failed: {e}"
+                results[i].failed = True
+                continue
+
+            results[i].commits = commits
+            results[i].timings["commit"] = elapsed
+
+            if recorded:
+                profiler.merge(*recorded)
+
+            if dry_run:
+                results[i].status = "dry run"
+            elif changed is None:
+                results[i].status = "up-to-date"
+            else:
+                results[i].status = "painted"
+
+                # our own commits change the calendar, so don't trust what we cached for those days
+                if calendar_cache and changed:
+                    calendar_cache.invalidate(job.user, changed)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+
+    pool.shutdown()
+
+    if cache_dir:
+        MirrorCache(cache_dir, max_bytes=cache_max_bytes).enforce_size_cap()
+    return results
+
+
+def print_report(results: List[BatchResult]):
+    stages = ["fetch", "render", "commit"]
+    rows = [
+        [
+            result.user or "?",
+            result.repo,
+            result.status,
+            str(result.commits),
+            *(
+                f"{result.timings[stage]:.2f}s" if stage in result.timings else "-"
+                for stage in stages
+            ),
+        ]
+        for result in results
+    ]
+    header = ["user", "repo", "status", "commits", *stages]
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+
+    for row in [header, *rows]:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
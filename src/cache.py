@@ -0,0 +1,301 @@
+import datetime
+import json
+import os
+import subprocess
+import threading
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .constants import DATETIME_FORMAT_DAY, GIT_CREDENTIAL_ARGS
+from .profiling import profiler
+from .util import clone_command, rmtree_readonly
+
+
+def dir_size(path: str) -> int:
+    size = 0
+
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return size
+
+
+def rev_parse(path: str, rev: str = "refs/heads/main") -> Optional[str]:
+    result = profiler.run(
+        ["git", "rev-parse", "--verify", "--quiet", rev],
+        capture_output=True,
+        text=True,
+        cwd=path,
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def is_remote_of(origin: str, repo: str, url: Optional[str] = None) -> bool:
+    """
+    Whether `origin` (the remote a mirror was cloned from) is `url`, or without one, a GitHub remote of `repo` (over https or ssh, as `gh` clones it).
+    """
+    if url:
+        return origin == url
+
+    origin = origin.lower().removesuffix("/").removesuffix(".git")
+    return origin.endswith(("/" + repo.lower(), ":" + repo.lower()))
+
+
+@dataclass
+class MirrorCache:
+    """
+    Keeps bare mirrors of dummy repositories between runs (for instance in a directory preserved by `actions/cache` or on a self-hosted runner),
+    so that each run only needs to fetch what changed rather than cloning the whole history.
+
+    Repositories are named with their owner (`owner/repo`), so mirrors of the same repository name for different users never collide.
+    Without `max_bytes`, the cache is left to grow (e.g. while several processes use it, see `run_batch`).
+    """
+
+    path: str
+    max_bytes: Optional[int] = 512 * 1024 * 1024
+
+    def mirror_path(self, repo: str) -> str:
+        return os.path.join(self.path, *repo.split("/")) + ".git"
+
+    def invalidate(self, repo: str):
+        path = self.mirror_path(repo)
+
+        if os.path.exists(path):
+            rmtree_readonly(path)
+
+    def sync(self, repo: str, url: Optional[str] = None) -> str:
+        """
+        Brings the mirror of `repo` up-to-date with the remote (cloning it if necessary, from `url` if given rather than with `gh`).
+
+        A mirror cloned from another remote or whose history was rewritten by someone else is discarded and cloned again,
+        and a mirror whose remote no longer exists is removed.
+        Returns the path of the mirror, and raises `subprocess.CalledProcessError` if the remote repository can't be cloned.
+        """
+        path = self.mirror_path(repo)
+
+        if os.path.exists(path):
+            origin = profiler.run(
+                ["git", "remote", "get-url", "origin"],
+                capture_output=True,
+                text=True,
+                cwd=path,
+            ).stdout.strip()
+
+            if not is_remote_of(origin, repo, url):
+                print(
+                    f"Cached mirror of {repo} was cloned from {origin}, discarding it."
+                )
+                self.invalidate(repo)
+
+        if os.path.exists(path):
+            previous = rev_parse(path)
+            fetch = profiler.run(
+                [
+                    "git",
+                    *GIT_CREDENTIAL_ARGS,
+                    "fetch",
+                    "--quiet",
+                    "--no-tags",
+                    "origin",
+                    "+refs/heads/main:refs/heads/main",
+                ],
+                capture_output=True,
+                cwd=path,
+            )
+            current = rev_parse(path)
+
+            if fetch.returncode != 0 or current is None:
+                print(f"Cached mirror of {repo} could not be updated, discarding it.")
+                self.invalidate(repo)
+            elif (
+                previous is not None
+                and previous != current
+                and profiler.run(
+                    ["git", "merge-base", "--is-ancestor", previous, current],
+                    cwd=path,
+                ).returncode
+                != 0
+            ):
+                print(f"History of {repo} was rewritten, discarding cached mirror.")
+                self.invalidate(repo)
+            else:
+                os.utime(path)
+                self.enforce_size_cap(repo, keep=True)
+                return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        try:
+            profiler.run(
+                clone_command(
+                    repo, path, ["--bare", "--single-branch", "--no-tags"], url
+                ),
+                check=True,
+            )
+        except subprocess.CalledProcessError:
+            # don't leave a partial clone to be taken for a mirror next time
+            self.invalidate(repo)
+            raise
+        self.enforce_size_cap(repo, keep=True)
+        return path
+
+    def update_from(self, repo: str, source: str):
+        """
+        Updates an existing mirror with the `main` branch of a local repository (i.e. after we've pushed it), so the next sync has nothing to fetch.
+        """
+        path = self.mirror_path(repo)
+
+        if not os.path.exists(path):
+            return
+
+        result = profiler.run(
+            [
+                "git",
+                "fetch",
+                "--quiet",
+                "--no-tags",
+                os.path.abspath(source),
+                "+refs/heads/main:refs/heads/main",
+            ],
+            capture_output=True,
+            cwd=path,
+        )
+
+        if result.returncode != 0:
+            self.invalidate(repo)
+            return
+        os.utime(path)
+        self.enforce_size_cap(repo)
+
+    def mirrors(self) -> List[str]:
+        mirrors: List[str] = []
+
+        for root, dirs, _ in os.walk(self.path):
+            for dir in list(dirs):
+                if dir.endswith(".git"):
+                    mirrors.append(os.path.join(root, dir))
+                    dirs.remove(dir)
+        return mirrors
+
+    def enforce_size_cap(self, repo: Optional[str] = None, keep: bool = False):
+        """
+        Garbage collects the mirror of `repo` (if any) if the cache is over its size cap, then evicts the least recently used mirrors until it fits.
+
+        If `keep` is set, the mirror of `repo` itself is never evicted (since it's about to be used).
+        """
+        max_bytes = self.max_bytes
+
+        if max_bytes is None or dir_size(self.path) <= max_bytes:
+            return
+
+        path = self.mirror_path(repo) if repo else None
+
+        if path and os.path.exists(path):
+            profiler.run(
+                ["git", "gc", "--quiet", "--prune=now"], capture_output=True, cwd=path
+            )
+
+        mirrors = sorted(
+            (m for m in self.mirrors() if not keep or m != path), key=os.path.getmtime
+        )
+        sizes = {mirror: dir_size(mirror) for mirror in mirrors}
+        total = dir_size(self.path)
+
+        for mirror in mirrors:
+            if total <= max_bytes:
+                break
+
+            print(f"Mirror cache is over its size cap, evicting {mirror}.")
+            rmtree_readonly(mirror)
+            total -= sizes[mirror]
+
+
+@dataclass
+class CalendarCache:
+    """
+    Persists contribution calendars as a JSON file of {user: {day: [count, day it was fetched on]}}.
+
+    A day fetched at least `horizon_days` after it happened is treated as settled and never requested again,
+    so a daily run over a multi-year window only needs to query the recent tail (and anything we've invalidated).
+    """
+
+    path: str
+    horizon_days: int = 7
+    users: Dict[str, Dict[str, List[int | str]]] = field(init=False)
+    # calendars of several users may be fetched (and stored) concurrently
+    lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        try:
+            with open(self.path) as f:
+                self.users = json.load(f).get("users", {})
+        except (OSError, ValueError):
+            self.users = {}
+
+    def lookup(
+        self, user: str, start: datetime.datetime, end: datetime.datetime
+    ) -> Tuple[Dict[datetime.date, int], List[Tuple[datetime.date, datetime.date]]]:
+        """
+        Returns the settled counts we have for each day from `start` to `end` (inclusive), along with the (inclusive) ranges of days that still need to be fetched.
+        """
+        days = self.users.get(user, {})
+        cached: Dict[datetime.date, int] = {}
+        missing: List[Tuple[datetime.date, datetime.date]] = []
+        day = start.date()
+
+        while day <= end.date():
+            entry = days.get(day.strftime(DATETIME_FORMAT_DAY))
+
+            if entry is not None and self.is_settled(day, str(entry[1])):
+                cached[day] = int(entry[0])
+            elif missing and missing[-1][1] == day - datetime.timedelta(days=1):
+                missing[-1] = (missing[-1][0], day)
+            else:
+                missing.append((day, day))
+            day += datetime.timedelta(days=1)
+        return cached, missing
+
+    def is_settled(self, day: datetime.date, fetched_on: str) -> bool:
+        fetched = datetime.datetime.strptime(fetched_on, DATETIME_FORMAT_DAY).date()
+        return (fetched - day).days >= self.horizon_days
+
+    def store(self, user: str, counts: Dict[datetime.date, int]):
+        today = datetime.datetime.now(datetime.UTC).strftime(DATETIME_FORMAT_DAY)
+
+        with self.lock:
+            days = self.users.setdefault(user, {})
+
+            for day, count in counts.items():
+                days[day.strftime(DATETIME_FORMAT_DAY)] = [count, today]
+            self.save()
+
+    def invalidate(self, user: str, days: Optional[Iterable[datetime.date]] = None):
+        """
+        Forgets the cached counts of `user` on the given days (or all of them), i.e. after we've changed the dummy commits on those days.
+        """
+        with self.lock:
+            if days is None:
+                self.users.pop(user, None)
+            else:
+                cached = self.users.get(user, {})
+
+                for day in days:
+                    cached.pop(day.strftime(DATETIME_FORMAT_DAY), None)
+            self.save()
+
+    def save(self):
+        """
+        Writes the cache out atomically (callers are expected to hold `lock`).
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = self.path + ".tmp"
+
+        with open(temp_path, "w") as f:
+            json.dump({"users": self.users}, f, separators=(",", ":"))
+        os.replace(temp_path, self.path)
@@ -6,10 +6,9 @@ DATETIME_FORMAT_DAY = "%Y-%m-%d"
 DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 # ex contributon date: '2023-10-03T00:00:00.000+00:00'
 CONTRIBUTION_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
-GRAPHQL_USER_CONTRIBUTION_QUERY_TEMPLATE = """
-{{
-  user(login: "{user}") {{
-    contributionsCollection(from: "{start}", to: "{end}") {{
+# each range of (at most 1 year of) contributions is requested as an aliased field (r0, r1, ...) in a single query
+GRAPHQL_CONTRIBUTION_COLLECTION_TEMPLATE = """
+    {alias}: contributionsCollection(from: "{start}", to: "{end}") {{
       contributionCalendar {{
         totalContributions
         weeks {{
@@ -20,7 +19,22 @@ GRAPHQL_USER_CONTRIBUTION_QUERY_TEMPLATE = """
           firstDay
         }}
       }}
-    }}
+    }}"""
+GRAPHQL_USER_CONTRIBUTION_QUERY_TEMPLATE = """
+{{
+  user(login: "{user}") {{{collections}
   }}
 }}
 """
+# how many yearly ranges to alias into a single query, and how many of those queries to run at once
+GRAPHQL_RANGES_PER_QUERY = 5
+GRAPHQL_MAX_CONCURRENT_QUERIES = 4
+# lets plain git commands authenticate using the gh cli's token (the same way `gh repo clone` does)
+GIT_CREDENTIAL_ARGS = [
+    "-c",
+    "credential.helper=",
+    "-c",
+    "credential.helper=!gh auth git-credential",
+]
+GITHUB_API_URL = "https://api.github.com"
+USER_AGENT = "github-paint (https://github.com/tbrockman/github-paint)"
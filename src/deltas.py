@@ -0,0 +1,130 @@
+import bisect
+import itertools
+import operator
+
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def contribution_deltas(
+    levels: Sequence[int], existing: Sequence[int]
+) -> Tuple[int, array]:
+    """
+    Given the desired color level of each day and the number of (non-dummy) contributions that already exist on it,
+    returns the quartile width along with the number of dummy commits needed on each day.
+
+    Everything is computed with `map` over flat integer vectors (indexed by day), so this stays cheap enough to evaluate for many candidate layouts.
+    `existing` may cover more days than `levels` (they all count towards the maximum), the returned deltas only cover `levels`.
+    """
+    quarter = max(existing) // 4
+    # if any day would need a negative number of commits, every quartile is widened by the shortfall
+    shortfall = max(0, max(map(operator.sub, existing, map(quarter.__mul__, levels))))
+    quarter += shortfall
+    deltas = array("q", map(operator.sub, map(quarter.__mul__, levels), existing))
+    return quarter, deltas
+
+
+def contribution_level(count: int, max_count: int, min_count: int = 0) -> int:
+    """
+    The shade GitHub gives a day with `count` contributions, in a period whose busiest day had `max_count`.
+
+    Experimentally, the shades are bands of width `max_count // 4` counting down from the maximum.
+    """
+    quarter = max_count // 4
+
+    if count >= max_count - quarter:
+        return 4
+    elif count >= max_count - 2 * quarter:
+        return 3
+    elif count >= max_count - 3 * quarter:
+        return 2
+    elif count >= min_count:
+        return 1
+    return 0
+
+
+def optimal_contribution_deltas(
+    levels: Sequence[int], existing: Sequence[int]
+) -> Optional[Tuple[int, array]]:
+    """
+    Like `contribution_deltas`, but searches for the busiest-day count (and so the quartile bands) that lands every day in its desired shade
+    (as modeled by `contribution_level`) with the fewest dummy commits in total. Every painted day also gets at least one contribution.
+
+    For each candidate maximum the cost is computed per shade from sorted counts and prefix sums, so the search is cheap even for multi-year windows.
+    Returns the chosen maximum along with the deltas, or None if no maximum can produce the desired shades.
+    """
+    groups: Dict[int, List[int]] = {level: [] for level in range(1, 5)}
+
+    for level, count in zip(levels, existing):
+        groups[level].append(count)
+
+    for counts in groups.values():
+        counts.sort()
+    prefix_sums = {
+        level: list(itertools.accumulate(counts, initial=0))
+        for level, counts in groups.items()
+    }
+    # days outside of the painted cells still count towards the maximum
+    unpainted_max = max(existing[len(levels) :], default=0)
+    highest = max(existing, default=0)
+    best: Optional[Tuple[int, int]] = None  # (cost, maximum)
+    # from 4 * (highest + 1) on, every existing count fits under the lightest band (so larger maximums only cost more),
+    # but separating all four shades takes a maximum of at least 5 (bands of 1, 1, 1 and 2 contributions)
+    upper = max(4 * (highest + 1), 5)
+
+    for maximum in range(max(highest, 1), upper + 1):
+        bands = contribution_bands(maximum)
+        cost = 0
+
+        for level, counts in groups.items():
+            if not counts:
+                continue
+
+            lowest, upper = bands[level]
+
+            if lowest > upper or counts[-1] > upper:
+                break
+
+            below = bisect.bisect_left(counts, lowest)
+            cost += lowest * below - prefix_sums[level][below]
+        else:
+            # some day has to actually reach the maximum, which can only be one painted in the darkest shade (or an unpainted day)
+            if unpainted_max < maximum:
+                if not groups[4]:
+                    continue
+                cost += maximum - max(groups[4][-1], bands[4][0])
+
+            if best is None or cost < best[0]:
+                best = (cost, maximum)
+
+    if best is None:
+        return None
+
+    maximum = best[1]
+    bands = contribution_bands(maximum)
+    deltas = array(
+        "q", (max(0, bands[level][0] - count) for level, count in zip(levels, existing))
+    )
+
+    if unpainted_max < maximum:
+        finals = [
+            (count + delta, i)
+            for i, (level, count, delta) in enumerate(zip(levels, existing, deltas))
+            if level == 4
+        ]
+        top, i = max(finals)
+        deltas[i] += maximum - top
+    return maximum, deltas
+
+
+def contribution_bands(maximum: int) -> Dict[int, Tuple[int, int]]:
+    """
+    The (inclusive) range of daily counts that lands in each shade when the busiest day has `maximum` contributions.
+    """
+    quarter = maximum // 4
+    return {
+        4: (maximum - quarter, maximum),
+        3: (maximum - 2 * quarter, maximum - quarter - 1),
+        2: (maximum - 3 * quarter, maximum - 2 * quarter - 1),
+        1: (1, maximum - 3 * quarter - 1),
+    }
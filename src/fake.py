@@ -0,0 +1,232 @@
+import datetime
+import json
+import os
+import re
+import subprocess
+import threading
+
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from .constants import DATETIME_FORMAT_DAY
+from .util import rmtree_readonly
+
+GRAPHQL_USER = re.compile(r'user\(login: "([^"]+)"\)')
+GRAPHQL_COLLECTION = re.compile(
+    r'(\w+): contributionsCollection\(from: "([^"]+)", to: "([^"]+)"\)'
+)
+
+
+class FakeGitHub:
+    """
+    An offline stand-in for the parts of GitHub we use, so whole runs can be load tested and profiled without a network:
+    the `user` and `repos` REST endpoints and the contribution calendar GraphQL query, with repositories kept as bare repositories under `root`
+    (at `{root}/{owner}/{repo}.git`, so `root` doubles as the `git_url` to clone from and push to).
+
+    The calendar counts the commits on the default branch of every repository of a user (by local date, like `GitHub.count_commits`),
+    on top of any other `contributions` they should appear to have made.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        login: str = "octocat",
+        name: str = "The Octocat",
+        email: str = "octocat@example.com",
+        contributions: Optional[Dict[datetime.date, int]] = None,
+    ):
+        self.root = os.path.abspath(root)
+        self.user = {"login": login, "name": name, "email": email}
+        self.contributions = contributions or {}
+        # creating and deleting repositories isn't atomic on disk
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(self.root, login), exist_ok=True)
+
+    def repo_path(self, owner: str, repo: str) -> str:
+        return os.path.join(self.root, owner, repo + ".git")
+
+    def repos(self, owner: str) -> List[str]:
+        path = os.path.join(self.root, owner)
+
+        if not os.path.isdir(path):
+            return []
+        return [
+            os.path.join(path, repo)
+            for repo in os.listdir(path)
+            if repo.endswith(".git")
+        ]
+
+    def calendar(self, owner: str) -> defaultdict[datetime.date, int]:
+        counts: defaultdict[datetime.date, int] = defaultdict(int, self.contributions)
+
+        for repo in self.repos(owner):
+            log = subprocess.run(
+                ["git", "log", "--pretty=format:%ct", "HEAD"],
+                capture_output=True,
+                text=True,
+                cwd=repo,
+            )
+
+            for line in log.stdout.splitlines():
+                counts[datetime.date.fromtimestamp(int(line))] += 1
+        return counts
+
+    def contribution_calendar(
+        self, counts: Dict[datetime.date, int], start: datetime.date, end: datetime.date
+    ) -> Dict[str, Any]:
+        weeks: List[Dict[str, Any]] = []
+        day = start
+
+        while day <= end:
+            # weeks start on Sunday
+            if not weeks or day.weekday() == 6:
+                weeks.append(
+                    {
+                        "firstDay": day.strftime(DATETIME_FORMAT_DAY),
+                        "contributionDays": [],
+                    }
+                )
+            weeks[-1]["contributionDays"].append(
+                {
+                    "contributionCount": counts.get(day, 0),
+                    "date": day.strftime(DATETIME_FORMAT_DAY),
+                }
+            )
+            day += datetime.timedelta(days=1)
+
+        return {
+            "totalContributions": sum(
+                d["contributionCount"] for w in weeks for d in w["contributionDays"]
+            ),
+            "weeks": weeks,
+        }
+
+    def graphql(self, query: str) -> Tuple[int, Any]:
+        user = GRAPHQL_USER.search(query)
+
+        if user is None:
+            return 200, {
+                "errors": [
+                    {"message": "Only contribution calendar queries are supported"}
+                ]
+            }
+
+        login = user.group(1)
+
+        if login != self.user["login"] and not self.repos(login):
+            return 200, {
+                "data": {"user": None},
+                "errors": [
+                    {
+                        "message": f"Could not resolve to a User with the login of '{login}'."
+                    }
+                ],
+            }
+
+        counts = self.calendar(login)
+        return 200, {
+            "data": {
+                "user": {
+                    alias: {
+                        "contributionCalendar": self.contribution_calendar(
+                            counts,
+                            datetime.datetime.fromisoformat(start.rstrip("Z")).date(),
+                            datetime.datetime.fromisoformat(end.rstrip("Z")).date(),
+                        )
+                    }
+                    for alias, start, end in GRAPHQL_COLLECTION.findall(query)
+                }
+            }
+        }
+
+    def create_repo(self, owner: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        name = body.get("name", "")
+        path = self.repo_path(owner, name)
+
+        with self.lock:
+            if not name or os.path.exists(path):
+                return 422, {"message": "Repository creation failed."}
+
+            subprocess.run(
+                ["git", "init", "--quiet", "--bare", "-b", "main", path], check=True
+            )
+        return 201, {
+            "full_name": f"{owner}/{name}",
+            "private": body.get("private", False),
+        }
+
+    def delete_repo(self, owner: str, repo: str) -> Tuple[int, Any]:
+        path = self.repo_path(owner, repo)
+
+        with self.lock:
+            if not os.path.exists(path):
+                return 404, {"message": "Not Found"}
+
+            rmtree_readonly(path)
+        return 204, {}
+
+    def handle(self, method: str, path: str, body: Any) -> Tuple[int, Any]:
+        parts = path.strip("/").split("/")
+
+        match method, parts:
+            case "POST", ["graphql"]:
+                return self.graphql(body.get("query", ""))
+            case "GET", ["user"]:
+                return 200, self.user
+            case "POST", ["user", "repos"]:
+                return self.create_repo(self.user["login"], body)
+            case "POST", ["orgs", owner, "repos"]:
+                return self.create_repo(owner, body)
+            case "GET", ["repos", owner, repo]:
+                if not os.path.exists(self.repo_path(owner, repo)):
+                    return 404, {"message": "Not Found"}
+                return 200, {"full_name": f"{owner}/{repo}"}
+            case "DELETE", ["repos", owner, repo]:
+                return self.delete_repo(owner, repo)
+        return 404, {"message": "Not Found"}
+
+
+def make_handler(fake: FakeGitHub, quiet: bool = True) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        # keep-alive, like GitHub (and what `HttpTransport` expects)
+        protocol_version = "HTTP/1.1"
+
+        def respond(self):
+            length = int(self.headers.get("content-length") or 0)
+            content = self.rfile.read(length) if length else b""
+
+            try:
+                body = json.loads(content) if content else {}
+                status, response = fake.handle(
+                    self.command, self.path.split("?")[0], body
+                )
+            except Exception as e:
+                status, response = 500, {"message": str(e)}
+
+            payload = json.dumps(response).encode() if status != 204 else b""
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_DELETE = respond
+
+        def log_message(self, format: str, *args: Any):
+            if not quiet:
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def serve(
+    fake: FakeGitHub, host: str = "127.0.0.1", port: int = 0, quiet: bool = True
+) -> ThreadingHTTPServer:
+    """
+    Starts serving the fake API on a background thread (on a free port by default, see `server.server_address`).
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(fake, quiet))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
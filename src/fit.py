@@ -0,0 +1,133 @@
+import bisect
+import dataclasses
+import itertools
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .fonts import Font, available_fonts, load_font
+
+
+class Overflow(str, Enum):
+    TRUNCATE = "truncate"
+    CLIP = "clip"
+
+
+@dataclass
+class Fit:
+    text: str
+    font_name: str
+    font: Font
+    padding: Tuple[int, int, int, int]
+    truncated: bool = False
+
+    def __str__(self):
+        return (
+            f"font={self.font_name} letter_spacing={self.font.letter_spacing} padding={self.padding}"
+            + (f" truncated to '{self.text}'" if self.truncated else "")
+        )
+
+
+def prefix_widths(font: Font, text: str) -> List[int]:
+    """
+    The width of every prefix of `text` (`widths[k]` being the width of `text[:k]`), in a single pass over the text.
+    """
+    widths = [0]
+
+    for i, c in enumerate(text):
+        width = widths[-1] + font.get_metrics(c)[0]
+
+        if i > 0:
+            width += font.spacing(text[i - 1], c)
+        widths.append(width)
+    return widths
+
+
+def min_spacing(font: Font, text: str) -> int:
+    """
+    The tightest letter spacing keeping the glyphs of `text` apart: none if each already ends in an empty column (as monospace glyphs do),
+    otherwise one, since trimmed proportional glyphs would merge into their neighbours.
+    """
+    glyphs = (font.get_glyph(c) for c in text[:-1])
+    return 0 if all(not glyph.cols or not glyph.cols[-1] for glyph in glyphs) else 1
+
+
+def padding_candidates(
+    padding: Tuple[int, int, int, int],
+) -> List[Tuple[int, int, int, int]]:
+    """
+    The requested padding, then without its horizontal padding, then without any padding at all.
+    """
+    top, _, bottom, _ = padding
+    candidates = [padding, (top, 0, bottom, 0), (0, 0, 0, 0)]
+    return [p for i, p in enumerate(candidates) if p not in candidates[:i]]
+
+
+def auto_fit(
+    text: str,
+    width: int,
+    height: int,
+    padding: Tuple[int, int, int, int] = (0, 0, 0, 0),
+    fonts: Optional[Sequence[str]] = None,
+    overflow: Overflow = Overflow.TRUNCATE,
+) -> Fit:
+    """
+    Searches for the most legible way to fit `text` in a `width` x `height` window.
+
+    Candidates are tried in order of preference: each font (in the given order, by default the bundled ones with monospace first),
+    then relaxing the horizontal padding, then all of it, and only then tightening the letter spacing (down to what keeps letters apart, see `min_spacing`).
+    The first candidate the whole text fits in wins. If none do, the candidate showing the most characters is used,
+    its text cut to what fits if `overflow` is TRUNCATE (or left for the window to clip if it's CLIP).
+
+    Each (font, spacing) pair measures the text once (see `prefix_widths`), every padding and truncation check after that is a lookup.
+    """
+    if fonts is None:
+        fonts = sorted(available_fonts(), key=lambda name: not name.endswith("-mono"))
+
+    measurements: Dict[Tuple[str, int], Tuple[Font, List[int], int]] = {}
+    best: Optional[Tuple[int, Fit]] = None  # (characters shown, fit)
+
+    loaded = {name: load_font(name) for name in fonts}
+    max_spacing = max(font.letter_spacing for font in loaded.values())
+    floors = {name: min_spacing(font, text) for name, font in loaded.items()}
+
+    for tightening, pad, name in itertools.product(
+        range(max_spacing + 1), padding_candidates(padding), fonts
+    ):
+        font = loaded[name]
+        spacing = font.letter_spacing - tightening
+
+        if spacing < floors[name]:
+            continue
+
+        key = (name, spacing)
+
+        if key not in measurements:
+            spaced = dataclasses.replace(font, letter_spacing=spacing)
+            text_height = max((spaced.get_metrics(c)[1] for c in text), default=0)
+            measurements[key] = (spaced, prefix_widths(spaced, text), text_height)
+
+        spaced, widths, text_height = measurements[key]
+
+        if text_height > height - pad[0] - pad[2]:
+            continue
+
+        shown = bisect.bisect_right(widths, width - pad[1] - pad[3]) - 1
+
+        if shown == len(text):
+            return Fit(text, name, spaced, pad)
+
+        if best is None or shown > best[0]:
+            best = (shown, Fit(text, name, spaced, pad))
+
+    if best is None:
+        # not even the shortest font fits vertically, so leave it to the window to clip
+        return Fit(text, fonts[0], loaded[fonts[0]], padding)
+
+    shown, fit = best
+
+    if overflow == Overflow.TRUNCATE and shown > 0:
+        fit.text = text[:shown].rstrip()
+        fit.truncated = True
+    return fit
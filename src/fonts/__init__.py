@@ -1,31 +1,169 @@
-from typing import List
-from dataclasses import dataclass
+import functools
+import os
 
-from ..util import Pixel
+from typing import Dict, List, Mapping, Sequence, Tuple
+from dataclasses import dataclass, field
+
+from ..util import INVERSE_LEVELS, Color, Pixel
+
+FONTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FONT = "nitram-micro-mono"
+
+OFF_LEVEL = Color.LIGHT_GREEN.value
+ON_LEVEL = Color.DARKEST_GREEN.value
 
 
 @dataclass
 class Glyph:
-    pixels: List[Pixel]
+    """
+    A monochrome glyph stored as one bitmask per column (bit `y` of `cols[x]` is set if pixel (x, y) is on).
+
+    Rasterizations (see `raster`) are cached per glyph, so drawing a character is a single copy of a byte string.
+    """
+
+    cols: List[int]
     width: int
     height: int
+    rasters: Dict[Tuple[int, int, bool], bytes] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    @classmethod
+    def from_rows(cls, rows: List[int], width: int) -> "Glyph":
+        """
+        Builds a glyph from one bitmask per row (bit `x` of `rows[y]` is set if pixel (x, y) is on).
+        """
+        cols = [
+            sum(1 << y for y, row in enumerate(rows) if row & (1 << x))
+            for x in range(width)
+        ]
+        return cls(cols, width=width, height=len(rows))
+
+    def trimmed(self, blank_width: int) -> "Glyph":
+        """
+        The glyph without its empty leading and trailing columns (a glyph with nothing drawn becomes `blank_width` empty columns).
+        """
+        lit = [x for x, mask in enumerate(self.cols) if mask]
+
+        if not lit:
+            return Glyph([0] * blank_width, width=blank_width, height=self.height)
+        return Glyph(
+            self.cols[lit[0] : lit[-1] + 1],
+            width=lit[-1] - lit[0] + 1,
+            height=self.height,
+        )
 
     def get_col(self, x: int) -> List[Pixel]:
-        return [self.pixels[y * self.width + x] for y in range(self.height)]
+        return [
+            Pixel(Color(ON_LEVEL if self.cols[x] & (1 << y) else OFF_LEVEL))
+            for y in range(self.height)
+        ]
+
+    def raster(self, height: int, empty_level: int, inverse: bool = False) -> bytes:
+        """
+        The glyph's color levels in column-major order, each column padded to `height` with `empty_level`
+        (the padding is left as is when `inverse` swaps the glyph's own levels).
+        """
+        key = (height, empty_level, inverse)
+        raster = self.rasters.get(key)
+
+        if raster is None:
+            padding = bytes([empty_level]) * (height - self.height)
+            cols = []
+
+            for mask in self.cols:
+                col = bytes(
+                    ON_LEVEL if mask & (1 << y) else OFF_LEVEL
+                    for y in range(self.height)
+                )
+
+                if inverse:
+                    col = col.translate(INVERSE_LEVELS)
+                cols.append(col + padding)
+            raster = self.rasters[key] = b"".join(cols)
+        return raster
 
 
 @dataclass
 class Font:
-    glyphs: List[Glyph]
+    glyphs: Sequence[Glyph] | Mapping[int, Glyph]  # indexed by codepoint
     letter_spacing: int = 1
+    # adjustments to the letter spacing between specific pairs of characters
+    kerning: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    # (width, height) of each character measured so far
+    metrics: Dict[str, Tuple[int, int]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
     def get_glyph(self, c: str) -> Glyph:
         return self.glyphs[ord(c)]
 
+    def get_metrics(self, c: str) -> Tuple[int, int]:
+        metrics = self.metrics.get(c)
+
+        if metrics is None:
+            glyph = self.get_glyph(c)
+            metrics = self.metrics[c] = (glyph.width, glyph.height)
+        return metrics
+
+    def spacing(self, left: str, right: str) -> int:
+        """
+        The number of empty columns between two consecutive characters (kerning never makes glyphs overlap).
+        """
+        return max(0, self.letter_spacing + self.kerning.get((left, right), 0))
+
     def get_text_dims(self, text: str) -> tuple[int, int]:
-        glyphs = [self.get_glyph(c) for c in text]
-        width = (
-            sum(glyph.width for glyph in glyphs) + (len(text) - 1) * self.letter_spacing
-        )
-        height = max(glyph.height for glyph in glyphs)
+        if not text:
+            return 0, 0
+
+        metrics = [self.get_metrics(c) for c in text]
+        width = sum(w for w, _ in metrics)
+
+        if self.kerning:
+            width += sum(map(self.spacing, text, text[1:]))
+        else:
+            width += (len(text) - 1) * self.letter_spacing
+        height = max(h for _, h in metrics)
         return width, height
+
+    def proportional(self, blank_width: int = 2) -> "Font":
+        """
+        A variable-width copy of this font, with the empty columns on either side of every glyph trimmed.
+        """
+        glyphs = self.glyphs
+        codepoints = (
+            glyphs.keys() if isinstance(glyphs, Mapping) else range(len(glyphs))
+        )
+        return Font(
+            {c: glyphs[c].trimmed(blank_width) for c in codepoints},
+            letter_spacing=self.letter_spacing,
+            kerning=dict(self.kerning),
+        )
+
+
+def available_fonts() -> List[str]:
+    return sorted(
+        name[: -len(".gpf")] for name in os.listdir(FONTS_DIR) if name.endswith(".gpf")
+    )
+
+
+def load_font(name: str = DEFAULT_FONT) -> Font:
+    """
+    Loads one of the compiled fonts shipped in this directory by name (see `available_fonts`), or a compiled font file by path.
+
+    Each font file is only mapped once, so its decoded glyphs (and their rasters) are shared by every caller.
+    """
+    path = name if name.endswith(".gpf") else os.path.join(FONTS_DIR, name + ".gpf")
+
+    if not os.path.exists(path):
+        raise ValueError(
+            f"Unknown font '{name}' (available: {', '.join(available_fonts())})"
+        )
+    return load_font_file(os.path.realpath(path))
+
+
+@functools.cache
+def load_font_file(path: str) -> Font:
+    from .compiled import read_font
+
+    return read_font(path)
@@ -0,0 +1,181 @@
+import bisect
+import mmap
+import os
+import struct
+
+from collections.abc import Mapping
+from typing import Dict, Iterator, List
+
+from . import Font, Glyph
+
+MAGIC = b"GPF\0"
+VERSION = 2
+
+# magic, version, letter spacing, bytes per column mask, glyph count
+HEADER_V1 = struct.Struct("<4sHBBI")
+# version 2 adds the number of kerning pairs
+HEADER = struct.Struct("<4sHBBII")
+# codepoint, width, height, offset of the first column mask (from the start of the mask data)
+GLYPH_ENTRY = struct.Struct("<IBBI")
+# left codepoint, right codepoint, spacing adjustment
+KERNING_ENTRY = struct.Struct("<IIb")
+
+
+class FontFormatError(Exception):
+    pass
+
+
+class CompiledGlyphs(Mapping[int, Glyph]):
+    """
+    The glyphs of a compiled font, indexed by codepoint.
+
+    The glyph table is binary searched in place and each glyph is only decoded (and then kept) the first time it's asked for,
+    so loading a font costs the same regardless of how many glyphs it has.
+    """
+
+    def __init__(
+        self,
+        data: mmap.mmap | bytes,
+        mask_bytes: int,
+        count: int,
+        table_offset: int,
+        masks_offset: int,
+    ):
+        self.data = data
+        self.mask_bytes = mask_bytes
+        self.count = count
+        self.table_offset = table_offset
+        self.masks_offset = masks_offset
+        self.decoded: Dict[int, Glyph] = {}
+
+    def codepoint(self, index: int) -> int:
+        return struct.unpack_from(
+            "<I", self.data, self.table_offset + index * GLYPH_ENTRY.size
+        )[0]
+
+    def __getitem__(self, codepoint: int) -> Glyph:
+        glyph = self.decoded.get(codepoint)
+
+        if glyph is not None:
+            return glyph
+
+        index = bisect.bisect_left(range(self.count), codepoint, key=self.codepoint)
+
+        if index == self.count or self.codepoint(index) != codepoint:
+            raise KeyError(codepoint)
+
+        _, width, height, offset = GLYPH_ENTRY.unpack_from(
+            self.data, self.table_offset + index * GLYPH_ENTRY.size
+        )
+        start = self.masks_offset + offset
+        cols = [
+            int.from_bytes(
+                self.data[
+                    start + x * self.mask_bytes : start + (x + 1) * self.mask_bytes
+                ],
+                "little",
+            )
+            for x in range(width)
+        ]
+        glyph = self.decoded[codepoint] = Glyph(cols, width=width, height=height)
+        return glyph
+
+    def __iter__(self) -> Iterator[int]:
+        return (self.codepoint(index) for index in range(self.count))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def read_font(path: str) -> Font:
+    """
+    Memory-maps a compiled font (see `compile_font`), only its header and kerning table are decoded up front.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(data) < HEADER_V1.size:
+        raise FontFormatError(f"{path} is too short to be a compiled font")
+
+    magic, version, letter_spacing, mask_bytes, count = HEADER_V1.unpack_from(data)
+
+    if magic != MAGIC:
+        raise FontFormatError(f"{path} is not a compiled font")
+
+    match version:
+        case 1:
+            table_offset = HEADER_V1.size
+            kerning_count = 0
+        case 2:
+            table_offset = HEADER.size
+            kerning_count = HEADER.unpack_from(data)[-1]
+        case _:
+            raise FontFormatError(
+                f"{path} has unsupported font format version {version}"
+            )
+
+    kerning_offset = table_offset + count * GLYPH_ENTRY.size
+    kerning = {}
+
+    for i in range(kerning_count):
+        left, right, adjustment = KERNING_ENTRY.unpack_from(
+            data, kerning_offset + i * KERNING_ENTRY.size
+        )
+        kerning[(chr(left), chr(right))] = adjustment
+
+    glyphs = CompiledGlyphs(
+        data,
+        mask_bytes,
+        count,
+        table_offset,
+        kerning_offset + kerning_count * KERNING_ENTRY.size,
+    )
+    return Font(glyphs, letter_spacing=letter_spacing, kerning=kerning)
+
+
+def compile_font(font: Font) -> bytes:
+    """
+    Serializes a font as a header, a glyph table sorted by codepoint, its kerning pairs, and the column bitmasks of every glyph.
+    """
+    glyphs = font.glyphs
+    codepoints = sorted(glyphs) if isinstance(glyphs, Mapping) else range(len(glyphs))
+    tallest = max((glyphs[c].height for c in codepoints), default=0)
+    mask_bytes = max(1, (tallest + 7) // 8)
+    table: List[bytes] = []
+    masks = bytearray()
+
+    for codepoint in codepoints:
+        glyph = glyphs[codepoint]
+        table.append(GLYPH_ENTRY.pack(codepoint, glyph.width, glyph.height, len(masks)))
+
+        for col in glyph.cols:
+            masks += col.to_bytes(mask_bytes, "little")
+
+    kerning = [
+        KERNING_ENTRY.pack(ord(left), ord(right), adjustment)
+        for (left, right), adjustment in sorted(font.kerning.items())
+    ]
+    header = HEADER.pack(
+        MAGIC, VERSION, font.letter_spacing, mask_bytes, len(table), len(kerning)
+    )
+    return header + b"".join(table) + b"".join(kerning) + bytes(masks)
+
+
+def write_font(font: Font, path: str):
+    temp_path = path + ".tmp"
+
+    with open(temp_path, "wb") as f:
+        f.write(compile_font(font))
+    os.replace(temp_path, path)
+
+
+if __name__ == "__main__":
+    # rebuilds the compiled fonts shipped with the action from their sources
+    from .default import nitram_micro_data_to_font, nitram_micro_mono_CP437_data
+    from . import FONTS_DIR
+
+    nitram_micro_mono = nitram_micro_data_to_font(nitram_micro_mono_CP437_data)
+    write_font(nitram_micro_mono, os.path.join(FONTS_DIR, "nitram-micro-mono.gpf"))
+    write_font(
+        nitram_micro_mono.proportional(), os.path.join(FONTS_DIR, "nitram-micro.gpf")
+    )
@@ -1,21 +1,13 @@
 from typing import List
 
-from . import Font, Glyph
-from ..util import Pixel, Color
+from . import Font, Glyph, load_font
 
 
 def nitram_micro_data_to_font(nitram_micro: List[int]) -> Font:
-    glyphs: List[Glyph] = []
-
-    for c in range(0, len(nitram_micro) // 5):
-        pixels: List[Pixel] = []
-        for y in range(5):
-            for x in range(5):
-                color = Color(
-                    4 if nitram_micro[c * 5 + y] & (1 << x) == (1 << x) else 1
-                )
-                pixels.append(Pixel(color))
-        glyphs.append(Glyph(pixels, width=5, height=5))
+    glyphs: List[Glyph] = [
+        Glyph.from_rows(nitram_micro[c * 5 : c * 5 + 5], width=5)
+        for c in range(0, len(nitram_micro) // 5)
+    ]
     return Font(glyphs, letter_spacing=1)
 
 # A default font for using to draw text on the screen
@@ -281,4 +273,9 @@ nitram_micro_mono_CP437_data = [
     0, 0, 0, 0, 0
 ]
 
-nitram_micro_mono_CP437 = nitram_micro_data_to_font(nitram_micro_mono_CP437_data)
\ No newline at end of file
+
+def __getattr__(name: str) -> Font:
+    # the font itself is loaded (from its compiled form) the first time it's used rather than built at import
+    if name == "nitram_micro_mono_CP437":
+        return load_font("nitram-micro-mono")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,25 +1,35 @@
 import datetime
-import json
 import math
+import operator
 import os
 import shutil
 import subprocess
 import tempfile
 
+from array import array
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Set, Tuple
-from signal import signal, SIGINT
+from typing import List, Optional, Sequence, Set, Tuple
+from signal import signal, SIGINT, SIG_IGN
 
 from .constants import (
     DATETIME_FORMAT,
     DATETIME_FORMAT_DAY,
     DUMMY_COMMIT_MESSAGE,
+    GRAPHQL_CONTRIBUTION_COLLECTION_TEMPLATE,
+    GRAPHQL_MAX_CONCURRENT_QUERIES,
+    GRAPHQL_RANGES_PER_QUERY,
     GRAPHQL_USER_CONTRIBUTION_QUERY_TEMPLATE,
+    GIT_CREDENTIAL_ARGS,
     JOB_AD,
 )
-from .util import Pixel, rmtree_readonly
+from .cache import CalendarCache, MirrorCache, rev_parse
+from .deltas import contribution_deltas, optimal_contribution_deltas
+from .profiling import profiler
+from .transport import HttpTransport, Transport, TransportError
+from .util import clone_command, rmtree_readonly
 
 
 class Visibility(str, Enum):
@@ -28,6 +38,12 @@ class Visibility(str, Enum):
     INTERNAL = "internal"
 
 
+class CommitBackend(str, Enum):
+    FAST_IMPORT = "fast-import"
+    PACK = "pack"
+    COMMIT = "commit"
+
+
 @dataclass(frozen=True)
 class Contribution:
     date: datetime.datetime
@@ -35,18 +51,21 @@ class Contribution:
 
 
 def initializer():
-    signal(SIGINT, lambda: None)  # type: ignore
+    # workers of a process pool leave interrupts to the parent process (which cancels the pool)
+    signal(SIGINT, SIG_IGN)
 
 
-def commit(date: datetime.datetime, last: bool = False):
-    seconds = math.floor(date.timestamp())
-
+def commit_message(last: bool = False) -> str:
     if last:
-        message = JOB_AD + "\n" + DUMMY_COMMIT_MESSAGE
-    else:
-        message = DUMMY_COMMIT_MESSAGE
+        return JOB_AD + "\n" + DUMMY_COMMIT_MESSAGE
+    return DUMMY_COMMIT_MESSAGE
 
-    return subprocess.run(
+
+def commit(date: datetime.datetime, last: bool = False, cwd: Optional[str] = None):
+    seconds = math.floor(date.timestamp())
+    message = commit_message(last)
+
+    return profiler.run(
         [
             "git",
             "commit",
@@ -58,145 +77,420 @@ def commit(date: datetime.datetime, last: bool = False):
         env=dict(os.environ)
         | {"GIT_COMMITTER_DATE": str(seconds), "GIT_AUTHOR_DATE": str(seconds)},
         check=True,
+        cwd=cwd,
     )
 
 
+def fast_import(
+    commits: List[Tuple[datetime.datetime, bool]],
+    name: str,
+    email: str,
+    ref: str = "refs/heads/main",
+    parent: Optional[str] = None,
+    cwd: Optional[str] = None,
+):
+    """
+    Writes all of the given (date, last) commits onto `ref` using a single `git fast-import` process,
+    rather than spawning one `git commit` per commit.
+
+    The first commit is parented onto `parent` (if given), otherwise `ref` is restarted from a root commit.
+    """
+    stream = bytearray()
+
+    for i, (date, last) in enumerate(commits):
+        seconds = math.floor(date.timestamp())
+        # `git commit -m` terminates the message with a newline, so we do the same
+        message = (commit_message(last) + "\n").encode()
+        stream += (
+            f"commit {ref}\n"
+            f"author {name} <{email}> {seconds} +0000\n"
+            f"committer {name} <{email}> {seconds} +0000\n"
+            f"data {len(message)}\n"
+        ).encode()
+        stream += message + b"\n"
+
+        if i == 0 and parent:
+            stream += f"from {parent}\n".encode()
+
+    return profiler.run(
+        ["git", "fast-import", "--quiet", "--force", "--date-format=raw"],
+        input=bytes(stream),
+        capture_output=True,
+        check=True,
+        cwd=cwd,
+    )
+
+
+def changed_days(
+    deltas: List[Contribution],
+    dummy_contribs: defaultdict[int, int],
+    since: Optional[datetime.datetime] = None,
+) -> List[datetime.date]:
+    """
+    The days on which the commits of `deltas` leave a different number of dummy commits than the repository had (`dummy_contribs`),
+    from the day `since` on (earlier commits being kept as they are), or on any day if the whole history is replaced.
+    """
+    desired = {delta.date.toordinal(): max(delta.count, 0) for delta in deltas}
+    first = since.toordinal() if since else 0
+    return [
+        datetime.date.fromordinal(day)
+        for day in sorted(set(desired) | set(dummy_contribs))
+        if day >= first and desired.get(day, 0) != dummy_contribs.get(day, 0)
+    ]
+
+
 class GitHub:
-    def __init__(self, token: str):
+    def __init__(
+        self,
+        token: str,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = 512 * 1024 * 1024,
+        transport: Optional[Transport] = None,
+        calendar_horizon_days: int = 7,
+        calendar_cache: Optional[CalendarCache] = None,
+        git_url: Optional[str] = None,
+    ):
         os.environ["GH_TOKEN"] = token
-        subprocess.run(
-            [
-                "git",
-                "config",
-                "--global",
-                "--add",
-                "safe.directory",
-                "/github/workspace",
-            ],
-            check=True,
+        # where repositories are cloned from and pushed to as `{git_url}/{owner}/{repo}.git` (with plain git, and created through the API),
+        # rather than through the `gh` cli (see `src.fake` for a local stand-in for GitHub)
+        self.git_url = git_url.rstrip("/") if git_url else None
+        self.transport = transport or HttpTransport(token)
+        self.user: Optional[dict[str, str]] = None
+        self.mirror_cache = (
+            MirrorCache(cache_dir, max_bytes=cache_max_bytes) if cache_dir else None
+        )
+        self.calendar_cache = calendar_cache or (
+            CalendarCache(
+                os.path.join(cache_dir, "calendar.json"),
+                horizon_days=calendar_horizon_days,
+            )
+            if cache_dir
+            else None
         )
+        # only written if missing: batch workers construct clients concurrently, and would otherwise race for the lock on the global config
+        safe_directories = profiler.run(
+            ["git", "config", "--global", "--get-all", "safe.directory"],
+            capture_output=True,
+            text=True,
+        ).stdout.splitlines()
+
+        if "/github/workspace" not in safe_directories:
+            profiler.run(
+                [
+                    "git",
+                    "config",
+                    "--global",
+                    "--add",
+                    "safe.directory",
+                    "/github/workspace",
+                ],
+                check=True,
+            )
 
     def get_user_contributions(
         self, user: str, start: datetime.datetime, end: datetime.datetime
+    ) -> List[Contribution]:
+        if self.calendar_cache is None:
+            return self.fetch_user_contributions(user, [(start, end)])
+
+        # only request the days we don't already have settled counts for
+        cached, missing = self.calendar_cache.lookup(user, start, end)
+        fetched = self.fetch_user_contributions(
+            user,
+            [
+                (
+                    datetime.datetime.combine(first, datetime.time()),
+                    datetime.datetime.combine(
+                        last + datetime.timedelta(days=1), datetime.time()
+                    ),
+                )
+                for first, last in missing
+            ],
+        )
+        fetched_counts = {c.date.date(): c.count for c in fetched}
+
+        if fetched_counts:
+            self.calendar_cache.store(user, fetched_counts)
+        counts = cached | fetched_counts
+        return [
+            Contribution(datetime.datetime.combine(day, datetime.time()), count)
+            for day, count in sorted(counts.items(), reverse=True)
+            if start.date() <= day <= end.date()
+        ]
+
+    def fetch_user_contributions(
+        self, user: str, spans: List[Tuple[datetime.datetime, datetime.datetime]]
     ) -> List[Contribution]:
         # divide start and end into time ranges of max 365 days (since the GitHub API only allows retrieving 1 year at a time)
         ranges: List[Tuple[datetime.datetime, datetime.datetime]] = []
 
-        while start < end:
-            next = min(start + datetime.timedelta(days=365), end)
-            ranges.append((start, next))
-            start = next
+        for start, end in spans:
+            while start < end:
+                next = min(start + datetime.timedelta(days=365), end)
+                ranges.append((start, next))
+                start = next
 
+        chunks = [
+            ranges[i : i + GRAPHQL_RANGES_PER_QUERY]
+            for i in range(0, len(ranges), GRAPHQL_RANGES_PER_QUERY)
+        ]
         contributions: Set[Contribution] = set()
 
-        for start_dt, end_dt in ranges:
-            start_str = start_dt.strftime(DATETIME_FORMAT)
-            end_str = end_dt.strftime(DATETIME_FORMAT)
-            query = GRAPHQL_USER_CONTRIBUTION_QUERY_TEMPLATE.format(
-                user=user, start=start_str, end=end_str
-            )
-            response = subprocess.run(
-                ["gh", "api", "graphql", "-F", f"query={query}"],
-                capture_output=True,
-                text=True,
+        with (
+            profiler.span("fetch calendar", "github", user=user, ranges=len(ranges)),
+            ThreadPoolExecutor(max_workers=GRAPHQL_MAX_CONCURRENT_QUERIES) as pool,
+        ):
+            for result in pool.map(
+                lambda chunk: self.query_contributions(user, chunk), chunks
+            ):
+                contributions.update(result)
+        return list(sorted(contributions, key=lambda c: c.date, reverse=True))
+
+    def query_contributions(
+        self, user: str, ranges: List[Tuple[datetime.datetime, datetime.datetime]]
+    ) -> List[Contribution]:
+        """
+        Retrieves the contribution calendars for all of the given (at most 1 year long) ranges with a single GraphQL query.
+        """
+        collections = "".join(
+            GRAPHQL_CONTRIBUTION_COLLECTION_TEMPLATE.format(
+                alias=f"r{i}",
+                start=start_dt.strftime(DATETIME_FORMAT),
+                end=end_dt.strftime(DATETIME_FORMAT),
             )
-            parsed = json.loads(response.stdout)
-            weeks = parsed["data"]["user"]["contributionsCollection"][
-                "contributionCalendar"
-            ]["weeks"]
+            for i, (start_dt, end_dt) in enumerate(ranges)
+        )
+        query = GRAPHQL_USER_CONTRIBUTION_QUERY_TEMPLATE.format(
+            user=user, collections=collections
+        )
+        data = self.transport.graphql(query)
+        contributions: List[Contribution] = []
+
+        for i in range(len(ranges)):
+            weeks = data["user"][f"r{i}"]["contributionCalendar"]["weeks"]
 
             for week in weeks:
                 for day in week["contributionDays"]:
                     date = datetime.datetime.strptime(day["date"], DATETIME_FORMAT_DAY)
                     count = day["contributionCount"]
-                    contributions.add(Contribution(date, count))
-        return list(sorted(contributions, key=lambda c: c.date, reverse=True))
+                    contributions.append(Contribution(date, count))
+        return contributions
 
     # you would think using the GitHub API would be easier than this
     # but because of pagination limits on commit history (or limits on max repositories to group contribution counts by)
     # it seems to be faster and more reliable to just clone the repository and count the commits
-    def count_dummy_repo_contributions(self, repo: str) -> defaultdict[str, int]:
-        temp_dir = tempfile.gettempdir()
-        repo_path = os.path.join(temp_dir, repo)
-        # clone the repo
-        subprocess.run(["gh", "repo", "clone", repo, repo_path])
+    def count_dummy_repo_contributions(self, repo: str) -> defaultdict[int, int]:
+        """
+        Counts the commits in the dummy repository on each day, keyed by the day's ordinal (`datetime.date.toordinal`).
+        """
+        if self.mirror_cache:
+            return self.count_commits(
+                self.mirror_cache.sync(self.full_repo_name(repo), self.remote_url(repo))
+            )
+
+        repo_path = tempfile.mkdtemp(suffix=".git")
+
+        try:
+            # we only need commit timestamps, so skip the working tree (and any trees) entirely
+            profiler.run(
+                clone_command(
+                    repo,
+                    repo_path,
+                    ["--bare", "--filter=tree:0", "--single-branch", "--no-tags"],
+                    self.remote_url(repo),
+                ),
+                check=True,
+            )
+            return self.count_commits(repo_path)
+        finally:
+            rmtree_readonly(repo_path)
+
+    def count_commits(self, repo_path: str) -> defaultdict[int, int]:
+        counts: defaultdict[int, int] = defaultdict(int)
+
         # we assume all commits in this repository are dummy commits
-        result = subprocess.run(
-            ["git", "log", "--pretty=format:%ct"],
+        with (
+            profiler.span("git log", "process"),
+            subprocess.Popen(
+                ["git", "log", "--pretty=format:%ct", "refs/heads/main"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                cwd=repo_path,
+            ) as process,
+        ):
+            for line in process.stdout:  # type: ignore
+                if not line.strip():
+                    continue
+
+                counts[datetime.date.fromtimestamp(int(line)).toordinal()] += 1
+        return counts
+
+    def dummy_repo_contributions(self, repo: str) -> defaultdict[int, int]:
+        # check if the dummy repo exists in github
+        if not self.repo_exists(repo):
+            return defaultdict(int)
+        return self.count_dummy_repo_contributions(repo)
+
+    def calc_necessary_contrib_deltas(
+        self,
+        cells: Sequence[int],
+        repo: str,
+        contribs: List[Contribution],
+        optimize: bool = False,
+        dummy_contribs: Optional[defaultdict[int, int]] = None,
+    ) -> List[Contribution]:
+        """
+        The number of dummy commits needed on each day, given the desired level of each cell.
+
+        `dummy_contribs` are the commits already in the dummy repository (see `dummy_repo_contributions`), counted here if not given.
+        """
+        if dummy_contribs is None:
+            dummy_contribs = self.dummy_repo_contributions(repo)
+
+        # the number of contributions on each day (indexed like `cells`) that aren't our own dummy commits
+        existing = array(
+            "q",
+            map(
+                operator.sub,
+                (c.count for c in contribs),
+                (dummy_contribs.get(c.date.toordinal(), 0) for c in contribs),
+            ),
+        )
+        levels = array("b", cells)
+        _, deltas = contribution_deltas(levels, existing)
+
+        if optimize:
+            optimal = optimal_contribution_deltas(levels, existing)
+
+            if optimal is None:
+                print("No quartile scale produces the desired shades, using default.")
+            else:
+                baseline = sum(max(delta, 0) for delta in deltas)
+                _, deltas = optimal
+
+                # the default scale can need fewer commits when it doesn't actually produce the desired shades (e.g. over an empty calendar)
+                if sum(deltas) < baseline:
+                    print(
+                        f"Optimized quartiles need {sum(deltas)} commits instead of {baseline} (saved {baseline - sum(deltas)})."
+                    )
+                else:
+                    print(f"Optimized quartiles need {sum(deltas)} commits.")
+        return [Contribution(c.date, delta) for c, delta in zip(contribs, deltas)]
+
+    def full_repo_name(self, repo: str) -> str:
+        # like `gh`, repos without an owner belong to the user of the token
+        return repo if "/" in repo else f"{self.get_user()['login']}/{repo}"
+
+    def remote_url(self, repo: str) -> Optional[str]:
+        return (
+            f"{self.git_url}/{self.full_repo_name(repo)}.git" if self.git_url else None
+        )
+
+    def repo_exists(self, repo: str) -> bool:
+        status, _ = self.transport.rest("GET", f"repos/{self.full_repo_name(repo)}")
+        return status == 200
+
+    def delete_repo(self, repo: str):
+        status, response = self.transport.rest(
+            "DELETE", f"repos/{self.full_repo_name(repo)}"
+        )
+
+        if status not in (204, 404):
+            print(f"Failed to delete {repo} ({status}): {response.get('message')}")
+
+    def create_repo(self, repo: str, visibility: Visibility):
+        owner, name = self.full_repo_name(repo).split("/", 1)
+        # repos of another owner than the token user are created under that organization
+        path = (
+            "user/repos" if owner == self.get_user()["login"] else f"orgs/{owner}/repos"
+        )
+        status, response = self.transport.rest(
+            "POST",
+            path,
+            {
+                "name": name,
+                "private": visibility != Visibility.PUBLIC,
+                "visibility": visibility.value,
+            },
+        )
+
+        if status != 201:
+            raise TransportError(
+                f"Failed to create {repo}: {response.get('message')}", status
+            )
+
+    def find_divergence(
+        self,
+        commits: List[Tuple[datetime.datetime, bool]],
+        name: str,
+        email: str,
+        path: str = ".",
+        since: Optional[datetime.datetime] = None,
+    ) -> Optional[Tuple[Optional[str], int]]:
+        """
+        Compares the desired (chronological) commits against the history already checked out at `path`, from the day `since` on
+        (the first day of the window, existing commits before it are outside of the graph and kept as they are).
+
+        Returns None if the history already matches, otherwise the id of the last existing commit that can be kept (or None if nothing can be)
+        and the index of the first desired commit that still needs to be written.
+        History is only ever kept in whole days, so that each day still ends on the commit carrying the `JOB_AD`.
+        """
+        result = profiler.run(
+            ["git", "log", "--reverse", "--pretty=format:%H %ct %an <%ae>"],
             capture_output=True,
             text=True,
-            cwd=repo_path,
+            cwd=path,
         )
-        counts: defaultdict[str, int] = defaultdict(int)
+        author = f"{name} <{email}>"
+        existing: List[Tuple[str, str]] = []
+        existing_counts: defaultdict[str, int] = defaultdict(int)
+        foreign_days: Set[str] = set()
 
         for line in result.stdout.split("\n"):
             if not line:
                 continue
 
-            timestamp = int(line.strip())
-            date = datetime.datetime.fromtimestamp(timestamp).strftime(
+            sha, timestamp, existing_author = line.strip().split(" ", 2)
+            date = datetime.datetime.fromtimestamp(int(timestamp)).strftime(
                 DATETIME_FORMAT_DAY
             )
-            counts[date] += 1
-        rmtree_readonly(repo_path)
-        return counts
-
-    def calc_necessary_contrib_deltas(
-        self, cells: List[Pixel], repo: str, contribs: List[Contribution]
-    ) -> List[Contribution]:
-        # check if the dummy repo exists in github
-        exists = (
-            subprocess.run(["gh", "repo", "view", repo], capture_output=True)
-        ).returncode == 0
-        dummy_contribs: defaultdict[str, int] = defaultdict(int)
-
-        if exists:
-            dummy_contribs = self.count_dummy_repo_contributions(repo)
-
-        # find the maximum number of contributions on a single day
-        contribs_without_dummy = [
-            c.count - dummy_contribs[c.date.strftime(DATETIME_FORMAT_DAY)]
-            for c in contribs
-        ]
-        max_contribs = max(contribs_without_dummy)
-        quarter = max_contribs // 4
-
-        deltas: List[Contribution] = []
-
-        # first pass:
-        # calculate the number of commits we need to add to each day to match the desired color
-        # if any day requires a negative number of commits, we will need to add commits to other days
-        minimum_desired = 0
-
-        for i, cell in enumerate(cells):
-            contrib = contribs[i]
-            desired_count = cell.color.value * quarter
-            str_date = contrib.date.strftime(DATETIME_FORMAT_DAY)
-            dummy_contrib_count = dummy_contribs[str_date]
-            delta = (
-                desired_count  # add the number of contributions for our desired color quartile
-                - contrib.count  # subtract the number of existing contributions on this day
-                + dummy_contrib_count  # add the number of existing dummy commits on this day
-            )
-            minimum_desired = min(minimum_desired, delta)
-
-        # second pass:
-        # add the minimum number of commits to each day to ensure that no day has a negative number of commits
-        quarter += abs(minimum_desired)
-
-        for i, cell in enumerate(cells):
-            contrib = contribs[i]
-            desired_count = cell.color.value * quarter
-            str_date = contrib.date.strftime(DATETIME_FORMAT_DAY)
-            dummy_contrib_count = dummy_contribs[str_date]
-            delta = (
-                desired_count  # add the number of contributions for our desired color quartile
-                - contrib.count  # subtract the number of existing contributions on this day
-                + dummy_contrib_count  # add the number of existing dummy commits on this day
-            )
-            deltas.append(Contribution(contrib.date, delta))
+            existing.append((sha, date))
+            existing_counts[date] += 1
+
+            if existing_author != author:
+                foreign_days.add(date)
+
+        desired_counts: defaultdict[str, int] = defaultdict(int)
+
+        for date, _ in commits:
+            desired_counts[date.strftime(DATETIME_FORMAT_DAY)] += 1
+
+        first_day = since.strftime(DATETIME_FORMAT_DAY) if since else ""
+        # the first day (in either history, within the window) whose commits don't match what we want
+        divergence = next(
+            (
+                day
+                for day in sorted(set(existing_counts) | set(desired_counts))
+                if day >= first_day
+                and (day in foreign_days or existing_counts[day] != desired_counts[day])
+            ),
+            None,
+        )
 
-        return deltas
+        if divergence is None:
+            return None
+
+        kept = [sha for sha, day in existing if day < divergence]
+        index = next(
+            (
+                i
+                for i, (date, _) in enumerate(commits)
+                if date.strftime(DATETIME_FORMAT_DAY) >= divergence
+            ),
+            len(commits),
+        )
+        return (kept[-1] if kept else None), index
 
     def make_necessary_commits(
         self,
@@ -205,20 +499,66 @@ class GitHub:
         name: str,
         email: str,
         visibility: Visibility,
-    ):
-        # remove existing repo (if it exists)
-        subprocess.run(["gh", "repo", "delete", repo, "--yes"])
+        backend: CommitBackend = CommitBackend.FAST_IMPORT,
+        incremental: bool = False,
+        work_dir: str = "..",
+        dummy_contribs: Optional[defaultdict[int, int]] = None,
+    ) -> Optional[List[datetime.date]]:
+        """
+        Writes and pushes the dummy commits for the given deltas, from a checkout of the repository under `work_dir`.
+
+        `dummy_contribs` are the commits already in the dummy repository (see `dummy_repo_contributions`), counted here if not given.
+        Returns the days whose number of dummy commits changed (see `changed_days`), or None if the repository was already up-to-date.
+        """
+        if dummy_contribs is None:
+            dummy_contribs = self.dummy_repo_contributions(repo)
+
+        incremental = incremental and self.repo_exists(repo)
+        since = min((delta.date for delta in deltas), default=None)
+        # incremental runs keep the commits from before the window, the others replace the whole history
+        changed = changed_days(deltas, dummy_contribs, since if incremental else None)
+
+        if not incremental:
+            # remove existing repo (if it exists)
+            self.delete_repo(repo)
 
         # create a new repo as a subdirectory
-        path = os.path.join("../", repo)
+        path = os.path.join(work_dir, repo)
 
         if os.path.exists(path):
             shutil.rmtree(path)
-        os.makedirs(path)
-        os.chdir(path)
-        subprocess.run(["git", "config", "--global", "user.name", name])
-        subprocess.run(["git", "config", "--global", "user.email", email])
-        subprocess.run(["git", "init", "-b", "main"], check=True)
+
+        mirror_path = (
+            self.mirror_cache.sync(self.full_repo_name(repo), self.remote_url(repo))
+            if incremental and self.mirror_cache
+            else None
+        )
+
+        if mirror_path:
+            # clone locally from the cached mirror, but push to the same remote it mirrors
+            profiler.run(["git", "clone", "--quiet", mirror_path, path], check=True)
+            origin = profiler.run(
+                ["git", "remote", "get-url", "origin"],
+                capture_output=True,
+                text=True,
+                cwd=mirror_path,
+                check=True,
+            ).stdout.strip()
+            profiler.run(
+                ["git", "remote", "set-url", "origin", origin], check=True, cwd=path
+            )
+        elif incremental:
+            profiler.run(
+                clone_command(repo, path, [], self.remote_url(repo)), check=True
+            )
+        else:
+            os.makedirs(path)
+            profiler.run(["git", "init", "-b", "main"], check=True, cwd=path)
+        # configured on the repository itself, so concurrent runs for different users don't clobber each other
+        profiler.run(["git", "config", "user.name", name], cwd=path)
+        profiler.run(["git", "config", "user.email", email], cwd=path)
+
+        commits: List[Tuple[datetime.datetime, bool]] = []
 
         # commit in reverse order
         for i, delta in enumerate(deltas[::-1]):
@@ -232,20 +572,140 @@ class GitHub:
                 )
 
                 for n in range(delta.count):
-                    commit(delta.date, n == delta.count - 1)
-        subprocess.run(
-            [
-                "gh",
-                "repo",
-                "create",
-                repo,
-                f"--{visibility.value}",
-                "--push",
-                "--source",
-                ".",
-            ]
+                    commits.append((delta.date, n == delta.count - 1))
+        parent: Optional[str] = None
+
+        if incremental:
+            divergence = self.find_divergence(commits, name, email, path, since=since)
+
+            if divergence is None:
+                print("Dummy repository is already up-to-date, nothing to push.")
+                return None
+
+            parent, index = divergence
+
+            if parent is None and index == len(commits):
+                # nothing to keep and nothing to write leaves no branch to push (and GitHub won't delete the default branch)
+                print(
+                    "No dummy commits are needed anymore, recreating the repository empty."
+                )
+                self.delete_repo(repo)
+                self.create_repo(repo, visibility)
+
+                if self.mirror_cache:
+                    self.mirror_cache.invalidate(self.full_repo_name(repo))
+                return changed
+
+            print(
+                f"Keeping existing history up to {parent or 'the root'}, writing {len(commits) - index} new commits."
+            )
+            commits = commits[index:]
+
+            # trim the branch back to the last commit we're keeping
+            if parent:
+                profiler.run(
+                    ["git", "update-ref", "refs/heads/main", parent],
+                    check=True,
+                    cwd=path,
+                )
+            else:
+                profiler.run(
+                    ["git", "update-ref", "-d", "refs/heads/main"], check=True, cwd=path
+                )
+
+        with profiler.span(
+            "write commits", "github", backend=backend.value, commits=len(commits)
+        ):
+            match backend:
+                case CommitBackend.FAST_IMPORT:
+                    fast_import(commits, name, email, parent=parent, cwd=path)
+                case CommitBackend.PACK:
+                    from .pack import write_commits
+
+                    write_commits(
+                        [
+                            (math.floor(date.timestamp()), commit_message(last))
+                            for date, last in commits
+                        ],
+                        name,
+                        email,
+                        os.path.join(path, ".git"),
+                        parent=parent,
+                    )
+                case CommitBackend.COMMIT:
+                    for date, last in commits:
+                        commit(date, last, cwd=path)
+        profiler.count("commits written", len(commits))
+
+        if profiler.enabled and commits:
+            profiler.count("bytes pushed", self.push_size(path))
+
+        if incremental:
+            profiler.run(
+                ["git", *GIT_CREDENTIAL_ARGS, "push", "--force", "origin", "main"],
+                check=True,
+                cwd=path,
+            )
+        elif self.git_url:
+            self.create_repo(repo, visibility)
+            profiler.run(
+                ["git", "remote", "add", "origin", self.remote_url(repo)],  # type: ignore
+                check=True,
+                cwd=path,
+            )
+
+            # there's no branch to push if no day needed dummy commits
+            if commits:
+                profiler.run(
+                    ["git", *GIT_CREDENTIAL_ARGS, "push", "--quiet", "origin", "main"],
+                    check=True,
+                    cwd=path,
+                )
+        else:
+            profiler.run(
+                [
+                    "gh",
+                    "repo",
+                    "create",
+                    repo,
+                    f"--{visibility.value}",
+                    "--push",
+                    "--source",
+                    ".",
+                ],
+                cwd=path,
+            )
+
+        if self.mirror_cache:
+            self.mirror_cache.update_from(self.full_repo_name(repo), path)
+        return changed
+
+    def push_size(self, path: str) -> int:
+        """
+        The size of the pack pushing `main` sends (everything the remote doesn't already have), recomputed locally since git doesn't report it.
+        """
+        revs = "main\n"
+
+        if rev_parse(path, "refs/remotes/origin/main"):
+            revs += "^refs/remotes/origin/main\n"
+
+        pack = profiler.run(
+            ["git", "pack-objects", "--revs", "--thin", "--stdout", "-q"],
+            input=revs.encode(),
+            capture_output=True,
+            cwd=path,
         )
+        return len(pack.stdout)
 
     def get_user(self) -> dict[str, str]:
-        response = subprocess.run(["gh", "api", "user"], capture_output=True, text=True)
-        return json.loads(response.stdout)
+        user = self.user
+
+        if user is None:
+            status, user = self.transport.rest("GET", "user")
+
+            if status != 200:
+                raise TransportError(
+                    f"Failed to retrieve token user: {user.get('message')}", status
+                )
+            self.user = user
+        return user
@@ -0,0 +1,337 @@
+import struct
+import zlib
+
+from enum import Enum
+from typing import TYPE_CHECKING, List
+
+from .window import Window
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# channels per pixel of each PNG color type (grey, rgb, palette, grey + alpha, rgba)
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# the 4x4 ordered dithering matrix, as thresholds in (0, 1)
+BAYER_4X4 = [
+    [0, 8, 2, 10],
+    [12, 4, 14, 6],
+    [3, 11, 1, 9],
+    [15, 7, 13, 5],
+]
+
+
+class Dither(str, Enum):
+    NONE = "none"
+    BAYER = "bayer"
+
+
+class ImageFormatError(Exception):
+    pass
+
+
+def unfilter_diagonals(
+    lines: "np.ndarray", kinds: "np.ndarray", bpp: int
+) -> "np.ndarray":
+    """
+    Undoes every kind of PNG filter at once, for images using Average or Paeth.
+
+    Those predict each pixel from the reconstructed pixels to its left, above and above-left, so neither rows nor columns can be undone on their own,
+    but the pixels of an anti-diagonal (x + y constant) don't depend on each other. The image is skewed so that each anti-diagonal is contiguous,
+    and reconstructed an anti-diagonal (a few array operations) at a time.
+    """
+    import numpy as np
+
+    height, stride = lines.shape
+    width = stride // bpp
+    diagonals = width + height - 1
+    # pixel (x, y) is at [x + y, y] of the skewed filtered bytes
+    skewed = np.zeros((diagonals, height, bpp), dtype=np.int16)
+    # and at [x + y + 2, y + 1] of the reconstructed ones, so the pixels before the first row and column read as zeros
+    out = np.zeros((diagonals + 2, height + 1, bpp), dtype=np.int16)
+    pixels = lines.reshape(height, width, bpp)
+
+    for y in range(height):
+        skewed[y : y + width, y] = pixels[y]
+
+    # which rows use each filter, as 0/1 factors of its predictor
+    masks = [(kinds == kind).astype(np.int16)[:, None] for kind in range(5)]
+    used = [bool(mask.any()) for mask in masks]
+
+    for d in range(diagonals):
+        first, last = max(0, d - width + 1), min(height - 1, d)
+        left = out[d + 1, first + 1 : last + 2]
+        up = out[d + 1, first : last + 1]
+        up_left = out[d, first : last + 1]
+        predictor = np.zeros_like(left)
+
+        if used[1]:
+            predictor += left * masks[1][first : last + 1]
+        if used[2]:
+            predictor += up * masks[2][first : last + 1]
+        if used[3]:
+            predictor += ((left + up) >> 1) * masks[3][first : last + 1]
+        if used[4]:
+            estimate = left + up - up_left
+            to_left = np.abs(estimate - left)
+            to_up = np.abs(estimate - up)
+            to_up_left = np.abs(estimate - up_left)
+            paeth = np.where(to_up <= to_up_left, up, up_left)
+            paeth = np.where((to_left <= to_up) & (to_left <= to_up_left), left, paeth)
+            predictor += paeth * masks[4][first : last + 1]
+
+        out[d + 2, first + 1 : last + 2] = (
+            skewed[d, first : last + 1] + predictor
+        ) & 0xFF
+
+    rows = np.empty((height, width, bpp), dtype=np.uint8)
+
+    for y in range(height):
+        rows[y] = out[y + 2 : y + 2 + width, y + 1]
+    return rows.reshape(height, stride)
+
+
+def unfilter_png(raw: bytes, height: int, stride: int, bpp: int) -> "np.ndarray":
+    """
+    Undoes the per-row filters of a (non-interlaced) PNG, returning its rows of raw sample bytes.
+
+    None, Sub and Up rows are undone a row at a time with array operations. Average and Paeth depend on the byte just reconstructed before them,
+    so images using them are undone an anti-diagonal at a time instead (see `unfilter_diagonals`).
+    """
+    import numpy as np
+
+    data = np.frombuffer(raw, dtype=np.uint8)
+
+    if len(data) < height * (stride + 1):
+        raise ImageFormatError("PNG image data is truncated")
+
+    filtered = data[: height * (stride + 1)].reshape(height, stride + 1)
+    kinds = filtered[:, 0]
+    unknown = kinds[kinds > 4]
+
+    if len(unknown):
+        raise ImageFormatError(f"Unknown PNG filter type {unknown[0]}")
+
+    if np.isin(kinds, (3, 4)).any():
+        return unfilter_diagonals(filtered[:, 1:], kinds, bpp)
+
+    rows = np.zeros((height, stride), dtype=np.uint8)
+    previous = np.zeros(stride, dtype=np.uint8)
+
+    for y in range(height):
+        kind, line = filtered[y, 0], filtered[y, 1:]
+
+        match kind:
+            case 0:
+                row = line.copy()
+            case 1:
+                # each byte adds the reconstructed byte `bpp` before it, i.e. a running sum per channel (which wraps around in uint8)
+                sums = np.cumsum(line.reshape(-1, bpp), axis=0, dtype=np.uint8)
+                row = sums.reshape(-1)
+            case _:
+                # Up (the only filter left)
+                row = line + previous
+        rows[y] = row
+        previous = rows[y]
+    return rows
+
+
+def read_png(data: bytes) -> "np.ndarray":
+    import numpy as np
+
+    pos = len(PNG_SIGNATURE)
+    header = None
+    palette = None
+    transparency = b""
+    chunks: List[bytes] = []
+
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack_from(">I4s", data, pos)
+        chunk = data[pos + 8 : pos + 8 + length]
+        pos += 12 + length
+
+        match kind:
+            case b"IHDR":
+                header = struct.unpack(">IIBBBBB", chunk)
+            case b"PLTE":
+                palette = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, 3)
+            case b"tRNS":
+                transparency = chunk
+            case b"IDAT":
+                chunks.append(chunk)
+            case b"IEND":
+                break
+
+    if header is None:
+        raise ImageFormatError("PNG is missing its header")
+
+    width, height, depth, color_type, _, _, interlace = header
+
+    if interlace:
+        raise ImageFormatError("Interlaced PNGs are not supported")
+
+    if color_type not in PNG_CHANNELS:
+        raise ImageFormatError(f"Unknown PNG color type {color_type}")
+
+    channels = PNG_CHANNELS[color_type]
+    bits = depth * channels
+    rows = unfilter_png(
+        zlib.decompress(b"".join(chunks)),
+        height,
+        (width * bits + 7) // 8,
+        max(1, bits // 8),
+    )
+
+    if depth < 8:
+        # packed samples (grey or palette indices), most significant bits first
+        bits_per_row = np.unpackbits(rows, axis=1)[:, : width * depth]
+        weights = 1 << np.arange(depth - 1, -1, -1)
+        samples = (bits_per_row.reshape(height, width, depth) * weights).sum(axis=2)
+        samples = samples.reshape(height, width, 1)
+    elif depth == 16:
+        pairs = rows.reshape(height, width * channels, 2).astype(np.uint32)
+        samples = (pairs[..., 0] << 8 | pairs[..., 1]).reshape(height, width, channels)
+    else:
+        samples = rows.reshape(height, width, channels)
+
+    if color_type == 3:
+        if palette is None:
+            raise ImageFormatError("Palette PNG is missing its palette")
+
+        alphas = np.full(256, 255, dtype=np.uint8)
+        alphas[: len(transparency)] = np.frombuffer(transparency, dtype=np.uint8)
+        indices = samples[..., 0]
+        samples = np.concatenate([palette[indices], alphas[indices][..., None]], axis=2)
+        max_value = 255
+        color_type = 6
+    else:
+        max_value = (1 << depth) - 1
+
+    pixels = samples.astype(np.float64) / max_value
+    has_alpha = color_type in (4, 6)
+    color = pixels[..., :-1] if has_alpha else pixels
+
+    if color.shape[2] == 3:
+        luminance = color @ np.array([0.299, 0.587, 0.114])
+    else:
+        luminance = color[..., 0]
+
+    if has_alpha:
+        # transparent pixels are composited onto white (i.e. left empty)
+        alpha = pixels[..., -1]
+        luminance = luminance * alpha + (1 - alpha)
+    return luminance
+
+
+def read_pgm(data: bytes) -> "np.ndarray":
+    """
+    Reads a binary (P5) or plain (P2) PGM.
+    """
+    import numpy as np
+
+    tokens: List[bytes] = []
+    pos = 0
+
+    # the header is the magic number, width, height and maximum value, separated by whitespace (with # comments)
+    while len(tokens) < 4:
+        while pos < len(data) and data[pos : pos + 1].isspace():
+            pos += 1
+
+        if pos >= len(data):
+            raise ImageFormatError("PGM header is truncated")
+
+        if data[pos : pos + 1] == b"#":
+            pos = data.find(b"\n", pos) + 1 or len(data)
+            continue
+
+        start = pos
+
+        while pos < len(data) and not data[pos : pos + 1].isspace():
+            pos += 1
+        tokens.append(data[start:pos])
+
+    magic, width, height, max_value = tokens[0], *map(int, tokens[1:])
+
+    if magic == b"P2":
+        samples = np.array(data[pos:].split()[: width * height], dtype=np.float64)
+    else:
+        # a single whitespace character separates the header from the raster
+        raster = data[pos + 1 :]
+        dtype = np.dtype(np.uint8) if max_value < 256 else np.dtype(">u2")
+        samples = np.frombuffer(raster, dtype=dtype, count=width * height)
+
+    if samples.size < width * height:
+        raise ImageFormatError("PGM image data is truncated")
+    return samples.reshape(height, width).astype(np.float64) / max_value
+
+
+def read_image(path: str) -> "np.ndarray":
+    """
+    Reads a PNG or PGM image as an array of luminance values (0 for black, 1 for white), indexed by (y, x).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if data.startswith(PNG_SIGNATURE):
+        return read_png(data)
+
+    if data[:2] in (b"P2", b"P5"):
+        return read_pgm(data)
+    raise ImageFormatError(f"{path} is neither a PNG nor a PGM image")
+
+
+def resize_axis(image: "np.ndarray", size: int, axis: int) -> "np.ndarray":
+    """
+    Resizes one axis of the image by averaging the source pixels covered by each destination pixel (or repeating them when enlarging).
+    """
+    import numpy as np
+
+    source_size = image.shape[axis]
+    edges = (np.arange(size) * source_size) // size
+
+    if source_size < size:
+        return np.take(image, edges, axis=axis)
+
+    sums = np.add.reduceat(image, edges, axis=axis)
+    counts = np.diff(np.append(edges, source_size))
+    shape = [1] * image.ndim
+    shape[axis] = size
+    return sums / counts.reshape(shape)
+
+
+def quantize(image: "np.ndarray", dither: Dither = Dither.NONE) -> "np.ndarray":
+    """
+    Maps luminance to the drawable color levels, darker pixels needing more contributions (black being `Color.DARKEST_GREEN`).
+    """
+    import numpy as np
+
+    ink = (1 - image) * 3
+
+    if dither == Dither.BAYER:
+        height, width = image.shape
+        thresholds = (np.array(BAYER_4X4) + 0.5) / 16
+        tiled = np.tile(thresholds, (height // 4 + 1, width // 4 + 1))[:height, :width]
+        levels = np.floor(ink + tiled)
+    else:
+        levels = np.rint(ink)
+    return (np.clip(levels, 0, 3) + 1).astype(np.uint8)
+
+
+def draw_image(
+    window: Window, path: str, dither: Dither = Dither.NONE, inverse: bool = False
+):
+    """
+    Scales the image to the window, quantizes it and writes the result straight into the window's buffer.
+    """
+    import numpy as np
+
+    image = read_image(path)
+    image = resize_axis(resize_axis(image, window.height, 0), window.width, 1)
+
+    if inverse:
+        image = 1 - image
+
+    levels = quantize(image, dither)
+    # the window's buffer is column-major
+    window.buf[:] = np.ascontiguousarray(levels.T).tobytes()
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import struct
+import zlib
+
+from typing import List, Optional, Tuple
+
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+
+OBJECT_TYPE_NAMES = {OBJ_COMMIT: b"commit", OBJ_TREE: b"tree"}
+
+
+def object_id(obj_type: int, data: bytes) -> bytes:
+    header = OBJECT_TYPE_NAMES[obj_type] + b" " + str(len(data)).encode() + b"\0"
+    return hashlib.sha1(header + data).digest()
+
+
+def commit_object(
+    tree: str,
+    parent: Optional[str],
+    name: str,
+    email: str,
+    seconds: int,
+    message: str,
+) -> bytes:
+    lines = [f"tree {tree}"]
+
+    if parent:
+        lines.append(f"parent {parent}")
+    lines.append(f"author {name} <{email}> {seconds} +0000")
+    lines.append(f"committer {name} <{email}> {seconds} +0000")
+    # `git commit -m` terminates the message with a newline, so we do the same
+    return ("\n".join(lines) + "\n\n" + message + "\n").encode()
+
+
+def pack_object_header(obj_type: int, size: int) -> bytes:
+    header = bytearray()
+    byte = (obj_type << 4) | (size & 0x0F)
+    size >>= 4
+
+    while size:
+        header.append(byte | 0x80)
+        byte = size & 0x7F
+        size >>= 7
+    header.append(byte)
+    return bytes(header)
+
+
+def zlib_stored(data: bytes) -> bytes:
+    """
+    Wraps `data` in a zlib stream made of uncompressed ("stored") deflate blocks.
+
+    Dummy commits are a couple hundred bytes each, where the setup cost of `zlib.compress` dwarfs the few bytes it would save.
+    """
+    out = bytearray(b"\x78\x01")
+    view = memoryview(data)
+
+    for start in range(0, max(len(data), 1), 0xFFFF):
+        block = view[start : start + 0xFFFF]
+        final = 1 if start + 0xFFFF >= len(data) else 0
+        out += struct.pack("<BHH", final, len(block), len(block) ^ 0xFFFF)
+        out += block
+    out += struct.pack(">I", zlib.adler32(data))
+    return bytes(out)
+
+
+def write_pack(objects: List[Tuple[bytes, int, bytes]], pack_dir: str) -> str:
+    """
+    Writes the given (id, type, data) objects as a single undeltified version 2 packfile (and its version 2 index) into `pack_dir`.
+
+    Returns the path of the written packfile.
+    """
+    pack = bytearray(b"PACK" + struct.pack(">II", 2, len(objects)))
+    entries: List[Tuple[bytes, int, int]] = []  # (id, crc32, offset)
+
+    for oid, obj_type, data in objects:
+        entry = pack_object_header(obj_type, len(data)) + zlib_stored(data)
+        entries.append((oid, zlib.crc32(entry), len(pack)))
+        pack += entry
+    pack_checksum = hashlib.sha1(pack).digest()
+    pack += pack_checksum
+
+    entries.sort(key=lambda e: e[0])
+    fanout = [0] * 256
+
+    for oid, _, _ in entries:
+        fanout[oid[0]] += 1
+
+    for i in range(1, 256):
+        fanout[i] += fanout[i - 1]
+
+    small_offsets = bytearray()
+    large_offsets = bytearray()
+
+    for _, _, offset in entries:
+        if offset < 0x80000000:
+            small_offsets += struct.pack(">I", offset)
+        else:
+            small_offsets += struct.pack(">I", 0x80000000 | len(large_offsets) // 8)
+            large_offsets += struct.pack(">Q", offset)
+
+    idx = bytearray(b"\377tOc" + struct.pack(">I", 2))
+    idx += struct.pack(">256I", *fanout)
+    idx += b"".join(oid for oid, _, _ in entries)
+    idx += b"".join(struct.pack(">I", crc) for _, crc, _ in entries)
+    idx += small_offsets + large_offsets + pack_checksum
+    idx += hashlib.sha1(idx).digest()
+
+    os.makedirs(pack_dir, exist_ok=True)
+    base = os.path.join(pack_dir, f"pack-{pack_checksum.hex()}")
+
+    with open(base + ".pack", "wb") as f:
+        f.write(pack)
+
+    # git only considers a packfile once its index exists, so the index is written last
+    with open(base + ".idx", "wb") as f:
+        f.write(idx)
+    return base + ".pack"
+
+
+def write_commits(
+    commits: List[Tuple[int, str]],
+    name: str,
+    email: str,
+    git_dir: str,
+    ref: str = "refs/heads/main",
+    parent: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Builds a linear history of empty commits (one per (timestamp, message) pair) in-process, writes it as one packfile and points `ref` at the last commit.
+
+    Every commit shares the same empty tree, so no git process is ever spawned. Returns the id of the new head (or `parent` if there was nothing to write).
+    """
+    if not commits:
+        return parent
+
+    tree_data = b""
+    tree = object_id(OBJ_TREE, tree_data)
+    tree_hex = tree.hex()
+    objects: List[Tuple[bytes, int, bytes]] = [(tree, OBJ_TREE, tree_data)]
+    # the id of the last commit written (the first one follows `parent` instead)
+    head = ""
+
+    for seconds, message in commits:
+        data = commit_object(tree_hex, head or parent, name, email, seconds, message)
+        oid = object_id(OBJ_COMMIT, data)
+        objects.append((oid, OBJ_COMMIT, data))
+        head = oid.hex()
+
+    write_pack(objects, os.path.join(git_dir, "objects", "pack"))
+    ref_path = os.path.join(git_dir, ref)
+    os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+
+    with open(ref_path, "w") as f:
+        f.write(head + "\n")
+    return head
@@ -0,0 +1,80 @@
+import time
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence
+
+from .profiling import profiler
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[..., Any]
+    # stages whose results this one is called with (as keyword arguments named after them)
+    after: Sequence[str] = ()
+
+
+@dataclass
+class Pipeline:
+    """
+    Runs stages on threads as soon as the stages they depend on have finished,
+    so independent work (API calls, cloning, rendering) overlaps and the total time approaches that of the slowest chain of stages.
+
+    If a stage fails, no further stages are started and its exception is raised once the running ones have finished.
+    """
+
+    stages: Dict[str, Stage] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, name: str, run: Callable[..., Any], after: Sequence[str] = ()):
+        unknown = [dep for dep in after if dep not in self.stages]
+
+        if unknown:
+            # requiring dependencies to be added first also rules out cycles
+            raise ValueError(
+                f"Stage {name} depends on unknown stages: {', '.join(unknown)}"
+            )
+        self.stages[name] = Stage(name, run, after)
+
+    def run_stage(self, stage: Stage, results: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+
+        try:
+            with profiler.span(stage.name, "stage"):
+                return stage.run(**results)
+        finally:
+            self.timings[stage.name] = time.perf_counter() - started
+
+    def run(self) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        pending: List[Stage] = list(self.stages.values())
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+            while pending or running:
+                for stage in [s for s in pending if all(d in results for d in s.after)]:
+                    pending.remove(stage)
+                    future = pool.submit(
+                        self.run_stage,
+                        stage,
+                        {dep: results[dep] for dep in stage.after},
+                    )
+                    running[future] = stage.name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+
+                    if future.exception() is not None:
+                        pending.clear()
+                        wait(running)
+                        raise future.exception()  # type: ignore
+                    results[name] = future.result()
+        return results
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{name} {seconds:.2f}s" for name, seconds in self.timings.items()
+        )
@@ -0,0 +1,276 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    start: float  # `time.perf_counter()`, which is system-wide (so spans of worker processes line up)
+    duration: float
+    pid: int
+    tid: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+def command_name(args: List[str]) -> str:
+    """
+    Names a command after its program and subcommand (e.g. `git push`), skipping options like `git -c credential.helper=... push`.
+    """
+    words = [args[0]]
+    rest = iter(args[1:])
+
+    for arg in rest:
+        if arg == "-c":
+            next(rest, None)
+        elif not arg.startswith("-"):
+            words.append(arg)
+            break
+    return " ".join(words)
+
+
+class Sampler:
+    """
+    Samples the stacks of every thread at a fixed interval, counting how often each (collapsed) stack is seen,
+    so the Python-side hot loops show up without the overhead (or the thread limitations) of a deterministic profiler.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: defaultdict[str, int] = defaultdict(int)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        own = threading.get_ident()
+
+        while not self.stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+
+                stack: List[str] = []
+
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back  # type: ignore
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, path: str):
+        """
+        Writes the samples in the collapsed stack format read by flamegraph.pl and speedscope.
+        """
+        with open(path, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Records spans (around stages, API calls and git/gh processes) and counters, when enabled.
+
+    Disabled by default, in which case spans and counters cost next to nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        # (time, counter, value after the change), for the counter tracks of the trace
+        self.counter_events: List[Tuple[float, str, int]] = []
+        self.lock = threading.Lock()
+        self.sampler: Optional[Sampler] = None
+
+    def enable(self, sample: bool = False):
+        """
+        Starts recording (from scratch, so a reused worker process doesn't report its previous jobs again).
+        """
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.spans, self.counter_events = [], []
+        self.counters.clear()
+
+        if sample:
+            self.sampler = Sampler()
+            self.sampler.start()
+
+    @contextmanager
+    def span(self, name: str, category: str = "stage", **args: Any) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            span = Span(
+                name,
+                category,
+                start,
+                time.perf_counter() - start,
+                os.getpid(),
+                threading.get_ident(),
+                args,
+            )
+
+            with self.lock:
+                self.spans.append(span)
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.counters[name] += n
+            self.counter_events.append((time.perf_counter(), name, self.counters[name]))
+
+    def run(self, args: List[str], **kwargs: Any) -> subprocess.CompletedProcess:
+        """
+        `subprocess.run`, in a span named after the command.
+        """
+        with self.span(command_name(args), "process", command=" ".join(args)):
+            return subprocess.run(args, **kwargs)
+
+    def export(self) -> Tuple[List[Span], Dict[str, int]]:
+        with self.lock:
+            return list(self.spans), dict(self.counters)
+
+    def merge(self, spans: List[Span], counters: Dict[str, int]):
+        """
+        Adds what another (worker) process recorded.
+        """
+        with self.lock:
+            self.spans += spans
+
+        for name, n in counters.items():
+            self.count(name, n)
+
+    def summary(self) -> str:
+        totals: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+
+        for span in self.spans:
+            totals[(span.category, span.name)].append(span.duration)
+
+        header = ["span", "kind", "calls", "total", "mean", "max"]
+        rows = [
+            [
+                name,
+                category,
+                str(len(durations)),
+                f"{sum(durations):.3f}s",
+                f"{sum(durations) / len(durations):.3f}s",
+                f"{max(durations):.3f}s",
+            ]
+            for (category, name), durations in sorted(
+                totals.items(), key=lambda item: sum(item[1]), reverse=True
+            )
+        ]
+        rows += [
+            [name, "counter", str(n), "", "", ""]
+            for name, n in sorted(self.counters.items())
+        ]
+        widths = [
+            max(len(row[i]) for row in [header, *rows]) for i in range(len(header))
+        ]
+        return "\n".join(
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+            for row in [header, *rows]
+        )
+
+    def write_trace(self, path: str):
+        """
+        Writes the spans and counters in the Chrome trace event format (loadable in chrome://tracing, Perfetto or speedscope).
+        """
+
+        def micros(t: float) -> float:
+            return round((t - self.origin) * 1e6, 3)
+
+        events: List[Dict[str, Any]] = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": micros(span.start),
+                "dur": round(span.duration * 1e6, 3),
+                "pid": span.pid,
+                "tid": span.tid,
+                "args": span.args,
+            }
+            for span in self.spans
+        ]
+        events += [
+            {
+                "name": name,
+                "ph": "C",
+                "ts": micros(t),
+                "pid": os.getpid(),
+                "args": {name: value},
+            }
+            for t, name, value in self.counter_events
+        ]
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def finish(self, summary: bool = True, trace_file: str = "", sample_file: str = ""):
+        if self.sampler:
+            self.sampler.stop()
+
+            if sample_file:
+                self.sampler.write(sample_file)
+                print(f"Stack samples written to {sample_file}")
+
+        if summary:
+            print(self.summary())
+
+        if trace_file:
+            self.write_trace(trace_file)
+            print(f"Trace written to {trace_file}")
+
+    @contextmanager
+    def session(
+        self, summary: bool = False, trace_file: str = "", sample_file: str = ""
+    ) -> Iterator[None]:
+        """
+        Records what runs inside it if any of the outputs are asked for, writing them out at the end (even if it fails).
+        """
+        if not (summary or trace_file or sample_file):
+            yield
+            return
+
+        self.enable(sample=bool(sample_file))
+
+        try:
+            yield
+        finally:
+            self.finish(summary, trace_file, sample_file)
+            self.enabled = False
+
+
+# shared by everything in the process, so instrumenting a function doesn't require threading a profiler through to it
+profiler = Profiler()
@@ -0,0 +1,149 @@
+import os
+import re
+import struct
+import sys
+import zlib
+
+from typing import TYPE_CHECKING, Iterator, List, Optional, TextIO
+
+from .image import PNG_SIGNATURE
+
+if TYPE_CHECKING:
+    from .util import PixelBuffer
+
+# 256-color terminal codes of each color level (see `Color`)
+ANSI_COLORS = {0: 28, 1: 40, 2: 34, 3: 22, 4: 16}
+ANSI_CELL = "█"
+# the shades of GitHub's (light theme) contribution graph, from no contributions to the most
+GITHUB_COLORS = ["#ebedf0", "#9be9a8", "#40c463", "#30a14e", "#216e39"]
+# GitHub draws 10px cells, 3px apart
+CELL_SIZE = 10
+CELL_GAP = 3
+
+# a run of the same level, in a row of levels
+RUN = re.compile(rb"(.)\1*", re.DOTALL)
+
+
+def rows(buffer: "PixelBuffer") -> Iterator[bytes]:
+    """
+    The levels of each row of the buffer, top to bottom (a strided slice, as the buffer is column-major).
+    """
+    for y in range(buffer.height):
+        yield bytes(buffer.buf[y :: buffer.height])
+
+
+def ansi_rows(buffer: "PixelBuffer") -> Iterator[str]:
+    """
+    Each row of the buffer as terminal output, with one color escape per run of the same level (rather than per cell).
+    """
+    escapes = {level: f"\033[38;5;{code}m" for level, code in ANSI_COLORS.items()}
+
+    for row in rows(buffer):
+        yield "".join(
+            escapes[run[0]] + ANSI_CELL * len(run) + "\033[0m"
+            for run in (match.group() for match in RUN.finditer(row))
+        )
+
+
+def ansi(buffer: "PixelBuffer") -> str:
+    return "\n".join(ansi_rows(buffer))
+
+
+def write_ansi(buffer: "PixelBuffer", out: Optional[TextIO] = None):
+    """
+    Writes the buffer to `out` (stdout by default) a row at a time, without building the whole picture first.
+    """
+    stream = out if out is not None else sys.stdout
+
+    for row in ansi_rows(buffer):
+        stream.write(row)
+        stream.write("\n")
+
+
+def svg(buffer: "PixelBuffer") -> str:
+    """
+    The buffer drawn like GitHub draws the contribution graph (rounded cells in its shades of green), as an SVG document.
+    """
+    step = CELL_SIZE + CELL_GAP
+    width = buffer.width * step - CELL_GAP
+    height = buffer.height * step - CELL_GAP
+    cells: List[List[str]] = [[] for _ in GITHUB_COLORS]
+
+    for y, row in enumerate(rows(buffer)):
+        for x, level in enumerate(row):
+            cells[level].append(
+                f'<rect x="{x * step}" y="{y * step}" width="{CELL_SIZE}" height="{CELL_SIZE}" rx="2"/>'
+            )
+
+    # cells of the same shade share their fill
+    groups = "".join(
+        f'<g fill="{color}">{"".join(rects)}</g>'
+        for color, rects in zip(GITHUB_COLORS, cells)
+        if rects
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+        f"{groups}</svg>\n"
+    )
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def png(buffer: "PixelBuffer") -> bytes:
+    """
+    The buffer drawn with GitHub's shades of green (square cells on a white background), as an RGB PNG image.
+
+    Each row of cells is built as one scanline and repeated for the height of a cell, so only one scanline per row is put together pixel by pixel.
+    """
+    colors = [bytes.fromhex(color[1:]) for color in GITHUB_COLORS]
+    white = b"\xff\xff\xff"
+    step = CELL_SIZE + CELL_GAP
+    width = buffer.width * step - CELL_GAP
+    height = buffer.height * step - CELL_GAP
+    # each scanline starts with its filter type (none)
+    gap = b"\x00" + white * width
+    lines: List[bytes] = []
+
+    for y, row in enumerate(rows(buffer)):
+        cells = (white * CELL_GAP).join(colors[level] * CELL_SIZE for level in row)
+        lines += [b"\x00" + cells] * CELL_SIZE
+
+        if y < buffer.height - 1:
+            lines += [gap] * CELL_GAP
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        PNG_SIGNATURE
+        + png_chunk(b"IHDR", header)
+        + png_chunk(b"IDAT", zlib.compress(b"".join(lines)))
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def write_preview(buffer: "PixelBuffer", path: str):
+    """
+    Writes a picture of the buffer to `path`, as an SVG or PNG image (mimicking GitHub's graph) depending on its extension,
+    and as terminal output otherwise.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    directory = os.path.dirname(path)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if extension == ".png":
+        with open(path, "wb") as f:
+            f.write(png(buffer))
+    elif extension == ".svg":
+        with open(path, "w") as f:
+            f.write(svg(buffer))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            write_ansi(buffer, f)
@@ -0,0 +1,245 @@
+import json
+import os
+import subprocess
+import threading
+import time
+import urllib.parse
+
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from .constants import GITHUB_API_URL, USER_AGENT
+from .profiling import profiler
+
+if TYPE_CHECKING:
+    import http.client
+
+
+class TransportType(str, Enum):
+    HTTP = "http"
+    GH = "gh"
+
+
+class TransportError(Exception):
+    def __init__(self, message: str, status: int = 0):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_body(content: str | bytes, status: int, what: str) -> Any:
+    """
+    The JSON body of a response (an empty object if it has none), or a `TransportError` if it isn't JSON (e.g. an HTML error page from a proxy).
+    """
+    if not content.strip():
+        return {}
+
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError as e:
+        raise TransportError(
+            f"{what} returned a non-JSON response ({status})", status
+        ) from e
+
+
+class Transport(ABC):
+    """
+    How we talk to the GitHub API, either natively over HTTP or by shelling out to the `gh` cli.
+
+    Subclasses implement `request`, which `rest` calls (counting and timing every call).
+    """
+
+    def rest(
+        self, method: str, path: str, body: Optional[Any] = None
+    ) -> Tuple[int, Any]:
+        profiler.count("api calls")
+
+        with profiler.span(f"{method} {path.lstrip('/')}", "api"):
+            return self.request(method, path, body)
+
+    @abstractmethod
+    def request(
+        self, method: str, path: str, body: Optional[Any] = None
+    ) -> Tuple[int, Any]: ...
+
+    def graphql(self, query: str) -> Dict[str, Any]:
+        status, parsed = self.rest("POST", "graphql", {"query": query})
+
+        if status != 200 or parsed.get("errors"):
+            errors = parsed.get("errors") or parsed.get("message") or parsed
+            raise TransportError(f"GraphQL query failed: {errors}", status)
+        return parsed["data"]
+
+
+class GhTransport(Transport):
+    def __init__(self, token: Optional[str] = None):
+        # passed to `gh` explicitly, so transports for different tokens can be used side by side
+        self.env = dict(os.environ) | {"GH_TOKEN": token} if token else None
+
+    def request(
+        self, method: str, path: str, body: Optional[Any] = None
+    ) -> Tuple[int, Any]:
+        args = ["gh", "api", "--include", "--method", method, path.lstrip("/")]
+
+        if body is not None:
+            args += ["--input", "-"]
+        response = subprocess.run(
+            args,
+            input=json.dumps(body) if body is not None else None,
+            capture_output=True,
+            text=True,
+            env=self.env,
+        )
+        # with --include, the response starts with the status line and headers
+        head, _, content = response.stdout.replace("\r\n", "\n").partition("\n\n")
+        status_line = head.split("\n", 1)[0].split(" ")
+
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            raise TransportError(f"gh api {path} failed: {response.stderr.strip()}")
+        status = int(status_line[1])
+        return status, parse_body(content, status, f"gh api {path}")
+
+
+class HttpTransport(Transport):
+    """
+    Talks to the GitHub REST and GraphQL APIs directly, reusing one keep-alive connection per thread
+    and retrying (with exponential backoff) when rate limited or on server errors.
+
+    `api_url` can point at GitHub Enterprise (https://host/api/v3) or at a local stub server.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        api_url: str = GITHUB_API_URL,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_wait: float = 60.0,
+        timeout: float = 30.0,
+    ):
+        self.token = token
+        self.api_url = api_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.local = threading.local()
+        parsed = urllib.parse.urlsplit(self.api_url)
+        self.scheme = parsed.scheme
+        self.netloc = parsed.netloc
+        self.base_path = parsed.path
+
+    def url_path(self, path: str) -> str:
+        if path == "graphql" and self.base_path.endswith("/api/v3"):
+            # GitHub Enterprise serves GraphQL from /api/graphql rather than /api/v3/graphql
+            return self.base_path[: -len("/v3")] + "/graphql"
+        return self.base_path + "/" + path.lstrip("/")
+
+    def connection(self) -> "http.client.HTTPConnection":
+        import http.client
+
+        connection = getattr(self.local, "connection", None)
+
+        if connection is None:
+            if self.scheme == "https":
+                connection = http.client.HTTPSConnection(
+                    self.netloc, timeout=self.timeout
+                )
+            else:
+                connection = http.client.HTTPConnection(
+                    self.netloc, timeout=self.timeout
+                )
+            self.local.connection = connection
+        return connection
+
+    def reset_connection(self):
+        connection = getattr(self.local, "connection", None)
+
+        if connection is not None:
+            connection.close()
+        self.local.connection = None
+
+    def retry_delay(
+        self, status: int, headers: "http.client.HTTPMessage", attempt: int
+    ) -> Optional[float]:
+        if status in (403, 429):
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+
+            if headers.get("x-ratelimit-remaining") == "0":
+                reset = float(headers.get("x-ratelimit-reset", time.time()))
+                return max(reset - time.time(), 0) + 1
+
+            # a 403 that isn't a rate limit is a genuine permission error
+            return self.backoff * 2**attempt if status == 429 else None
+
+        if status >= 500:
+            return self.backoff * 2**attempt
+        return None
+
+    def request(
+        self, method: str, path: str, body: Optional[Any] = None
+    ) -> Tuple[int, Any]:
+        # only imported once a request is made (it's a good part of the CLI's startup time otherwise)
+        import http.client
+
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Accept": "application/vnd.github+json",
+            "User-Agent": USER_AGENT,
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
+        payload = None
+
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                connection = self.connection()
+                connection.request(method, self.url_path(path), payload, headers)
+                response = connection.getresponse()
+                content = response.read()
+            except (http.client.HTTPException, ConnectionError, TimeoutError) as e:
+                # the server may close idle keep-alive connections, so reconnect and try again
+                self.reset_connection()
+
+                if attempt == self.max_retries:
+                    raise TransportError(f"{method} {path} failed: {e}") from e
+                profiler.count("api retries")
+                time.sleep(self.backoff * 2**attempt)
+                continue
+
+            if response.getheader("connection", "").lower() == "close":
+                self.reset_connection()
+
+            delay = self.retry_delay(response.status, response.headers, attempt)
+
+            if delay is not None and attempt < self.max_retries:
+                if delay > self.max_wait:
+                    raise TransportError(
+                        f"{method} {path} is rate limited for another {delay:.0f}s",
+                        response.status,
+                    )
+                print(
+                    f"{method} {path} returned {response.status}, retrying in {delay:.1f}s"
+                )
+                profiler.count("api retries")
+                time.sleep(delay)
+                continue
+
+            return response.status, parse_body(
+                content, response.status, f"{method} {path}"
+            )
+        raise TransportError(f"{method} {path} failed after {self.max_retries} retries")
+
+
+def make_transport(
+    transport_type: TransportType, token: str, api_url: str = GITHUB_API_URL
+) -> Transport:
+    match transport_type:
+        case TransportType.HTTP:
+            return HttpTransport(token, api_url=api_url)
+        case TransportType.GH:
+            return GhTransport(token)
@@ -6,25 +6,36 @@ import shutil
 
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import List
-
-from dateutil.relativedelta import relativedelta, SU, SA  # type: ignore
-
-now = datetime.datetime.now(datetime.UTC).replace(
-    hour=0, minute=0, second=0, microsecond=0
-)
-next_saturday = now + relativedelta(weekday=SA(0))
-prev_sunday_52_weeks_ago = next_saturday - datetime.timedelta(weeks=52, days=6)
+from typing import List, Optional
 
 
 def sunday_of_date(date: datetime.datetime) -> datetime.datetime:
+    from dateutil.relativedelta import relativedelta, SU  # type: ignore
+
     return date - relativedelta(weekday=SU(-1))
 
 
 def next_saturday_of_date(date: datetime.datetime) -> datetime.datetime:
+    from dateutil.relativedelta import relativedelta, SA  # type: ignore
+
     return date + relativedelta(weekday=SA(0))
 
 
+# computed when asked for rather than at import (so they don't go stale in long-lived processes, and cost nothing to commands that don't need them)
+def today() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def next_saturday() -> datetime.datetime:
+    return next_saturday_of_date(today())
+
+
+def prev_sunday_52_weeks_ago() -> datetime.datetime:
+    return next_saturday() - datetime.timedelta(weeks=52, days=6)
+
+
 class Color(Enum):
     GREY = 0  # unused as we can't manually draw grey (no commit) pixels in GitHub contributions
     LIGHT_GREEN = 1
@@ -50,39 +61,47 @@ class Pixel:
     color: Color
 
     def __repr__(self):
-        match self.color:
-            case Color.DARKEST_GREEN:
-                return "\033[38;5;16m█\033[0m"
-            case Color.DARK_GREEN:
-                return "\033[38;5;22m█\033[0m"
-            case Color.GREEN:
-                return "\033[38;5;34m█\033[0m"
-            case Color.LIGHT_GREEN:
-                return "\033[38;5;40m█\033[0m"
-            case Color.GREY:
-                return "\033[38;5;28m█\033[0m"
+        from .render import ANSI_CELL, ANSI_COLORS
+
+        return f"\033[38;5;{ANSI_COLORS[self.color.value]}m{ANSI_CELL}\033[0m"
+
+
+# swaps each drawable color level with its opposite (see `bytes.translate`)
+INVERSE_LEVELS = bytes.maketrans(b"\x01\x02\x03\x04", b"\x04\x03\x02\x01")
 
 
 @dataclass
 class PixelBuffer:
+    """
+    A column-major buffer of color levels (one byte per pixel, the `Color` value), pixel `i` being at x = i // height, y = i % height.
+
+    `Pixel` objects are only created when asked for (see `get_pixel`/`pixels`).
+    """
+
     width: int
     height: int
     empty_pixel: Pixel
-    buf: List[Pixel] = field(init=False)
+    buf: bytearray = field(init=False)
 
     def __post_init__(self):
-        self.buf = [self.empty_pixel for _ in range(self.width * self.height)]
+        self.buf = bytearray([self.empty_pixel.color.value]) * (
+            self.width * self.height
+        )
+
+    def get_pixel(self, i: int) -> Pixel:
+        return Pixel(Color(self.buf[i]))
+
+    def set_pixel(self, i: int, pixel: Pixel):
+        self.buf[i] = pixel.color.value
+
+    def pixels(self) -> List[Pixel]:
+        return [Pixel(Color(level)) for level in self.buf]
 
     def __repr__(self):
-        table = [
-            [self.empty_pixel for _ in range(self.width)] for _ in range(self.height)
-        ]
+        # rendered straight from the buffer (see `render.write_ansi` to stream it instead)
+        from .render import ansi
 
-        for i, pixel in enumerate(self.buf):
-            x = i // self.height
-            y = i % self.height
-            table[y][x] = pixel
-        return "\n".join(["".join([str(pixel) for pixel in row]) for row in table])
+        return ansi(self)
 
 
 def handle_remove_readonly(func, path, exc):  # type: ignore
@@ -96,3 +115,14 @@ def handle_remove_readonly(func, path, exc):  # type: ignore
 
 def rmtree_readonly(path: str):
     shutil.rmtree(path, onerror=handle_remove_readonly)  # type: ignore
+
+
+def clone_command(
+    repo: str, path: str, options: List[str], url: Optional[str] = None
+) -> List[str]:
+    """
+    The command cloning `repo` into `path`: from `url` with plain git if given (e.g. a local stand-in for GitHub), otherwise with the `gh` cli.
+    """
+    if url:
+        return ["git", "clone", "--quiet", *options, url, path]
+    return ["gh", "repo", "clone", repo, path, *(["--", *options] if options else [])]
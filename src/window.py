@@ -1,8 +1,8 @@
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Optional, Tuple
 
 from .fonts import Font
-from .util import Pixel, PixelBuffer, Color, HAlign, VAlign
+from .util import PixelBuffer, HAlign, VAlign
 
 
 @dataclass
@@ -28,56 +28,95 @@ class Window(PixelBuffer):
         Repeated text will be repeated as many times as possible (given window size), and then positioned according to specified alignment and padding.
         """
 
-        text_width, text_height = font.get_text_dims(text)
-        sep_width, sep_height = font.get_text_dims(separator)
+        if repeat:
+            self.draw_repeated_text(text, font, separator, inverse, h_align, v_align)
+            return
 
-        while repeat and text_width < self.width:
-            text += separator + text
-            text_width += (
-                font.letter_spacing + sep_width + font.letter_spacing + text_width
-            )
+        text_buffer = self.rasterize(text, font, inverse=inverse)
+        self.layout(text_buffer, h_align, v_align)
 
-        text_height = max(text_height, sep_height) if repeat else text_height
+    def draw_repeated_text(
+        self,
+        text: str,
+        font: Font,
+        separator: str,
+        inverse: bool,
+        h_align: HAlign,
+        v_align: VAlign,
+    ):
+        """
+        Lays out the text as if it were doubled (with separators) until it is at least as wide as the window,
+        but only rasterizes a single period (text + separator) and tiles it over the visible columns.
+        """
+        text_width, _ = font.get_text_dims(text)
+        _, height = font.get_text_dims(text + separator)
+        # the columns between consecutive copies of the text (including the separator and the spacing around it)
+        gap = font.get_text_dims(text + separator + text)[0] - 2 * text_width
+
+        if text_width + gap == 0:
+            # an empty text and separator have nothing to draw, and repeating them would never fill the window
+            return
+
+        width = text_width
+
+        while width < self.width:
+            width += gap + width
+
+        # one period is the text and separator followed by the spacing before the next copy of the text
+        period = self.rasterize(
+            text + separator,
+            font,
+            inverse=inverse,
+            width=text_width + gap,
+            height=height,
+        )
+        delta_x, delta_y = self.alignment_offset(width, height, h_align, v_align)
+        x0 = max(0, -delta_x)
+        x1 = min(width, self.width - delta_x)
+
+        if x0 >= x1:
+            return
+
+        start = x0 % period.width
+        repeats = (start + x1 - x0) // period.width + 1
+        tiles = PixelBuffer(width=x1 - x0, height=height, empty_pixel=self.empty_pixel)
+        tiles.buf[:] = (period.buf * repeats)[
+            start * height : (start + x1 - x0) * height
+        ]
+        self.blit(tiles, delta_x + x0, delta_y)
+
+    def rasterize(
+        self,
+        text: str,
+        font: Font,
+        inverse: bool = False,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+    ) -> PixelBuffer:
+        """
+        Renders the text into a new buffer (at least as wide and tall as the text), glyphs aligned to its top-left corner.
+        """
+        text_width, text_height = font.get_text_dims(text)
+        text_height = max(text_height, height or 0)
         text_buffer = PixelBuffer(
-            width=text_width,
+            width=max(text_width, width or 0),
             height=text_height,
             empty_pixel=self.empty_pixel,
         )
-
-        first_char = True
         i = 0
 
-        while i < len(text_buffer.buf):
-            for c in text:
-                if not first_char:
-                    for _ in range(font.letter_spacing * text_height):
-                        text_buffer.buf[i] = self.empty_pixel
-                        i += 1
-
-                first_char = False
-
-                glyph = font.get_glyph(c)
-                remaining_height = (
-                    text_height - glyph.height
-                )  # guaranteed to be positive
-
-                for x in range(glyph.width):
-                    col = glyph.get_col(x)
-
-                    for pixel in col:
-                        text_buffer.buf[i] = (
-                            pixel
-                            if not inverse
-                            else Pixel(
-                                Color(4 - pixel.color.value + 1)
-                            )  # assumes we don't use Color.GREY
-                        )
-                        i += 1
-
-                    for _ in range(remaining_height):
-                        text_buffer.buf[i] = self.empty_pixel
-                        i += 1
-        self.layout(text_buffer, h_align, v_align)
+        for n, c in enumerate(text):
+            if n > 0:
+                # letter spacing is left as empty pixels
+                i += font.spacing(text[n - 1], c) * text_height
+
+            raster = font.get_glyph(c).raster(
+                text_height, self.empty_pixel.color.value, inverse
+            )
+            # shorter glyphs are padded with empty pixels
+            text_buffer.buf[i : i + len(raster)] = raster
+            i += len(raster)
+        return text_buffer
 
     def layout(
         self,
@@ -85,6 +124,21 @@ class Window(PixelBuffer):
         h_align: HAlign,
         v_align: VAlign,
     ):
+        delta_x, delta_y = self.alignment_offset(
+            buffer.width, buffer.height, h_align, v_align
+        )
+        self.blit(buffer, delta_x, delta_y)
+
+    def alignment_offset(
+        self,
+        width: int,
+        height: int,
+        h_align: HAlign,
+        v_align: VAlign,
+    ) -> Tuple[int, int]:
+        """
+        Where the top-left corner of content of the given size should be placed in the window to respect the alignment and padding.
+        """
         delta_y = 0
         delta_x = 0
 
@@ -93,29 +147,44 @@ class Window(PixelBuffer):
                 delta_y = self.padding[0]
             case VAlign.CENTER:
                 delta_y = (
-                    (self.height - buffer.height) // 2
-                    + self.padding[0]
-                    - self.padding[2]
+                    (self.height - height) // 2 + self.padding[0] - self.padding[2]
                 )
             case VAlign.BOTTOM:
-                delta_y = self.height - buffer.height - self.padding[2]
+                delta_y = self.height - height - self.padding[2]
 
         match h_align:
             case HAlign.LEFT:
                 delta_x = self.padding[3]
             case HAlign.CENTER:
-                delta_x = (
-                    (self.width - buffer.width) // 2 + self.padding[3] - self.padding[1]
-                )
+                delta_x = (self.width - width) // 2 + self.padding[3] - self.padding[1]
             case HAlign.RIGHT:
-                delta_x = self.width - buffer.width - self.padding[1]
+                delta_x = self.width - width - self.padding[1]
+        return delta_x, delta_y
+
+    def blit(self, buffer: PixelBuffer, delta_x: int, delta_y: int):
+        """
+        Copies `buffer` into the window with its top-left corner at (delta_x, delta_y).
+
+        The visible intersection is computed once up-front, so only the visible columns are ever touched (as whole slices).
+        """
+        x0 = max(0, -delta_x)
+        x1 = min(buffer.width, self.width - delta_x)
+        y0 = max(0, -delta_y)
+        y1 = min(buffer.height, self.height - delta_y)
+
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        if buffer.height == self.height and delta_y == 0:
+            # full-height columns are contiguous, so the whole visible area is a single slice
+            self.buf[(x0 + delta_x) * self.height : (x1 + delta_x) * self.height] = (
+                buffer.buf[x0 * buffer.height : x1 * buffer.height]
+            )
+            return
 
-        for j in range(buffer.width):
-            for i in range(buffer.height):
-                window_x = j + delta_x
-                window_y = i + delta_y
+        rows = y1 - y0
 
-                if 0 <= window_x < self.width and 0 <= window_y < self.height:
-                    buffer_index = j * buffer.height + i
-                    window_index = window_x * self.height + window_y
-                    self.buf[window_index] = buffer.buf[buffer_index]
+        for x in range(x0, x1):
+            src = x * buffer.height + y0
+            dst = (x + delta_x) * self.height + y0 + delta_y
+            self.buf[dst : dst + rows] = buffer.buf[src : src + rows]